@@ -0,0 +1,381 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, as_completed, wait
+from itertools import permutations
+
+import numpy as np
+
+from BitboardPosition import MinimaxABAgent, MonteCarloAgent, empty_board, random_player
+from HeuristicPosition import HeuristicBitboardAgent
+from MonteCarloTreeSearch import MCTSAgent
+
+# Agent factories by name. "name:n" passes n to the factory (search depth or simulations).
+# Workers build their agents from these names, so only names cross process boundaries.
+AGENTS = {
+    'random': lambda: random_player,
+    'minimax': lambda depth=4: MinimaxABAgent(depth).choose_action,
+    'heuristic': lambda depth=4: HeuristicBitboardAgent(depth).choose_action,
+    'montecarlo': lambda num_simulations=100: MonteCarloAgent(num_simulations).choose_action,
+    'mcts': lambda num_simulations=100: MCTSAgent(num_simulations).choose_action,
+}
+
+
+def make_agent(spec):
+    # agent(board, player) function for a spec like 'minimax' or 'minimax:6'
+    name, _, arg = spec.partition(':')
+    if name not in AGENTS:
+        raise ValueError(f"Unknown agent {name}, choose from {', '.join(AGENTS)}")
+    return AGENTS[name](int(arg)) if arg else AGENTS[name]()
+
+
+def game_seed(seed, game_id):
+    # Seeding Random with a string hashes it with SHA-512, so the seed is the same in every process and run
+    return random.Random(f"{seed}:{game_id}").getrandbits(32)
+
+
+def play_game(game_id, first, second, seed, shape=(6, 7)):
+    """
+    One game between two agent specs, first moving first as player 1. The random and NumPy
+    global generators are seeded with seed first, so the game replays exactly. Returns the
+    record written to the results file.
+    """
+    random.seed(seed)
+    np.random.seed(seed)
+    agents = {1: make_agent(first), -1: make_agent(second)}
+    seconds = {1: 0.0, -1: 0.0}
+    position = empty_board(shape)
+    player = 1
+    while True:
+        start_time = time.perf_counter()
+        action = int(agents[player](position.to_numpy(), player))
+        seconds[player] += time.perf_counter() - start_time
+        if not position.can_play(action):
+            winner = -player  # an illegal move loses
+            break
+        position.add_stone(action, player)
+        terminal_state, winner = position.terminal()
+        if terminal_state:
+            break
+        player = -player
+    return {
+        'game': game_id,
+        'first': first,
+        'second': second,
+        'seed': seed,
+        'winner': winner,
+        'moves': ''.join(str(col + 1) for col in position.history),
+        'first_time': seconds[1],
+        'first_moves': (position.moves + 1) // 2,
+        'second_time': seconds[-1],
+        'second_moves': position.moves // 2,
+    }
+
+
+def schedule(agents, games_per_pairing, seed=0):
+    """
+    (game id, first, second, seed) of a round-robin: every ordered pair of agents plays
+    games_per_pairing games, so every pairing is played with both colors. Two agents give a
+    head-to-head match.
+    """
+    games = []
+    for first, second in permutations(agents, 2):
+        for i in range(games_per_pairing):
+            game_id = f"{first}-{second}-{i}"
+            games.append((game_id, first, second, game_seed(seed, game_id)))
+    return games
+
+
+def load_results(path):
+    # Records already in a results file, skipping a last line cut short by an interruption
+    records = []
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError:
+                    pass
+    return records
+
+
+def run_tournament(agents, games_per_pairing=10, output='arena.jsonl', workers=None, seed=0, shape=(6, 7)):
+    """
+    Play a round-robin between agent specs on a process pool. Every finished game is appended
+    to output as a JSON line right away; games already in output are skipped, so an
+    interrupted tournament resumes where it stopped. Returns the records of all games.
+    """
+    games = schedule(agents, games_per_pairing, seed)
+    game_ids = {game[0] for game in games}
+    records = [record for record in load_results(output) if record['game'] in game_ids]
+    done = {record['game'] for record in records}
+    pending = [game for game in games if game[0] not in done]
+    if done:
+        print(f"Resuming: {len(done)} of {len(games)} games already played")
+    if os.path.exists(output) and os.path.getsize(output):
+        with open(output, 'rb+') as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b'\n':  # end a line cut short, so the next record starts on its own line
+                f.write(b'\n')
+
+    with open(output, 'a') as f, ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(play_game, *game, shape) for game in pending]
+        for i, future in enumerate(as_completed(futures), 1):
+            record = future.result()
+            f.write(json.dumps(record) + '\n')
+            f.flush()
+            records.append(record)
+            if i % 100 == 0:
+                print(f"{len(records)}/{len(games)} games")
+    return records
+
+
+def head_to_head(agent1, agent2, games_per_color=10, **kwargs):
+    return run_tournament([agent1, agent2], games_per_color, **kwargs)
+
+
+def expected_score(elo):
+    # Expected score of a player elo points stronger than the opponent
+    return 1 / (1 + 10 ** (-elo / 400))
+
+
+def elo_difference(score, games):
+    # Elo difference that predicts score; a score of 0 or 1 counts as half a game less extreme
+    score = min(max(score, 0.5 / games), 1 - 0.5 / games)
+    return -400 * math.log10(1 / score - 1)
+
+
+class MatchStatistics:
+    """
+    Wins, draws and losses of agent 1 against agent 2, with the stopping rules of a sequential
+    match. Scores count a draw as half a win.
+    """
+
+    def __init__(self):
+        self.wins = 0
+        self.draws = 0
+        self.losses = 0
+
+    def add(self, result):
+        # result of one game for agent 1: 1, 0 or -1
+        if result > 0:
+            self.wins += 1
+        elif result == 0:
+            self.draws += 1
+        else:
+            self.losses += 1
+
+    @property
+    def games(self):
+        return self.wins + self.draws + self.losses
+
+    def score(self):
+        return (self.wins + self.draws / 2) / self.games
+
+    def elo(self):
+        return elo_difference(self.score(), self.games)
+
+    def interval(self, z=1.96):
+        # Wilson confidence interval of the score with the per-game variance, which stays
+        # sensible for one-sided results where the plain normal interval collapses to a point
+        n = self.games
+        score = self.score()
+        variance = (self.wins + self.draws / 4) / n - score ** 2
+        shrink = 1 + z * z / n
+        center = (score + z * z / (2 * n)) / shrink
+        half_width = z / shrink * math.sqrt(variance / n + z * z / (4 * n * n))
+        return max(center - half_width, 0.0), min(center + half_width, 1.0)
+
+    def elo_interval(self, z=1.96):
+        low, high = self.interval(z)
+        return elo_difference(low, self.games), elo_difference(high, self.games)
+
+    def llr(self, elo0, elo1):
+        """
+        Log-likelihood ratio of "agent 1 is elo1 stronger" against "agent 1 is elo0 stronger",
+        with every game a Bernoulli trial of the expected score and a draw half a win, half a loss.
+        """
+        s0, s1 = expected_score(elo0), expected_score(elo1)
+        win, loss = math.log(s1 / s0), math.log((1 - s1) / (1 - s0))
+        return self.wins * win + self.losses * loss + self.draws * (win + loss) / 2
+
+    def sprt(self, elo0=0, elo1=50, alpha=0.05, beta=0.05):
+        """
+        Wald's sequential probability ratio test: 'H1' once the games show agent 1 at least elo1
+        stronger, 'H0' once they show it at most elo0 stronger, with error rates alpha and beta,
+        None while more games are needed.
+        """
+        llr = self.llr(elo0, elo1)
+        if llr >= math.log((1 - beta) / alpha):
+            return 'H1'
+        if llr <= math.log(beta / (1 - alpha)):
+            return 'H0'
+        return None
+
+    def confidence(self, z=1.96, precision=0.05):
+        """
+        'better' or 'worse' once the score interval excludes 0.5, 'equal' once it is narrower
+        than precision on either side of the score, else None. The interval is looked at after
+        every game, so use a larger z than for a single fixed-size test.
+        """
+        low, high = self.interval(z)
+        if low > 0.5:
+            return 'better'
+        if high < 0.5:
+            return 'worse'
+        if high - low <= 2 * precision:
+            return 'equal'
+        return None
+
+
+def sequential_match(agent1, agent2, max_games=1000, test='sprt', elo0=0, elo1=50, alpha=0.05, beta=0.05,
+                     z=1.96, precision=0.05, min_games=10, output=None, workers=None, seed=0, shape=(6, 7)):
+    """
+    Head-to-head match that stops as soon as test ('sprt' or 'confidence') decides, after at
+    least min_games and at most max_games games. Colors alternate and games are numbered as in
+    schedule(), so output files are shared with run_tournament and resumed the same way.
+
+    Games run on a process pool a few at a time, but the test sees results in game order, so
+    the decision does not depend on the number of workers. Returns a dict with the counts for
+    agent 1, its score and Elo difference with a confidence interval, and the decision (None if
+    max_games ran out first).
+    """
+    workers = workers or os.cpu_count()
+    games = []
+    for i in range(max_games):
+        first, second = (agent1, agent2) if i % 2 == 0 else (agent2, agent1)
+        game_id = f"{first}-{second}-{i // 2}"
+        games.append((game_id, first, second, game_seed(seed, game_id)))
+    existing = {record['game']: record for record in load_results(output)} if output else {}
+
+    stats = MatchStatistics()
+    records = {}  # by game index, as they finish
+    decision = None
+    next_game = 0  # games[:next_game] are counted in stats
+    submitted = 0
+    f = open(output, 'a') if output else None
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            running = {}
+            while decision is None and next_game < max_games:
+                while submitted < max_games and len(running) < 2 * workers:
+                    game = games[submitted]
+                    if game[0] in existing:
+                        records[submitted] = existing[game[0]]
+                    else:
+                        running[executor.submit(play_game, *game, shape)] = submitted
+                    submitted += 1
+                if running and next_game not in records:
+                    done, _ = wait(running, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        record = future.result()
+                        records[running.pop(future)] = record
+                        if f:
+                            f.write(json.dumps(record) + '\n')
+                            f.flush()
+                while next_game in records and decision is None:
+                    winner = records[next_game]['winner']
+                    stats.add(winner if next_game % 2 == 0 else -winner)  # agent 1 moves first in even games
+                    next_game += 1
+                    if stats.games >= min_games:
+                        decision = (stats.sprt(elo0, elo1, alpha, beta) if test == 'sprt'
+                                    else stats.confidence(z, precision))
+            for future in running:  # games already started are finished and kept for a later run
+                future.cancel()
+            for future in running:
+                if not future.cancelled() and f:
+                    f.write(json.dumps(future.result()) + '\n')
+    finally:
+        if f:
+            f.close()
+
+    elo_low, elo_high = stats.elo_interval(z)
+    return {
+        'games': stats.games,
+        'wins': stats.wins,
+        'draws': stats.draws,
+        'losses': stats.losses,
+        'score': stats.score(),
+        'elo': stats.elo(),
+        'elo_interval': (elo_low, elo_high),
+        'decision': decision,
+    }
+
+
+def standings(records):
+    """
+    {agent: {'games', 'wins', 'draws', 'losses', 'score', 'elo', 'ms_per_move'}} over the
+    records, where score counts a draw as half a win and elo is the Elo difference to the
+    average opponent that predicts that score.
+    """
+    table = {}
+    for record in records:
+        for side, sign in (('first', 1), ('second', -1)):
+            row = table.setdefault(record[side], {'games': 0, 'wins': 0, 'draws': 0, 'losses': 0,
+                                                  'seconds': 0.0, 'moves': 0})
+            row['games'] += 1
+            if record['winner'] == sign:
+                row['wins'] += 1
+            elif record['winner'] == 0:
+                row['draws'] += 1
+            else:
+                row['losses'] += 1
+            row['seconds'] += record[side + '_time']
+            row['moves'] += record[side + '_moves']
+    for row in table.values():
+        row['score'] = (row['wins'] + row['draws'] / 2) / row['games']
+        row['elo'] = elo_difference(row['score'], row['games'])
+        row['ms_per_move'] = 1000 * row.pop('seconds') / max(row.pop('moves'), 1)
+    return table
+
+
+def print_standings(table):
+    print(f"{'agent':>16} {'games':>6} {'wins':>6} {'draws':>6} {'losses':>6} {'score':>6} {'elo':>6} "
+          f"{'ms/move':>9}")
+    for agent, row in sorted(table.items(), key=lambda item: -item[1]['score']):
+        print(f"{agent:>16} {row['games']:6} {row['wins']:6} {row['draws']:6} {row['losses']:6} "
+              f"{row['score']:6.1%} {row['elo']:6.0f} {row['ms_per_move']:9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Round-robin between Connect 4 agents on a process pool, "
+                                                 "or a sequential head-to-head match with --test.")
+    parser.add_argument('agents', nargs='+', help=f"agent specs like minimax:4, from {', '.join(AGENTS)}")
+    parser.add_argument('-n', '--games', type=int, default=10,
+                        help="games per pairing and color, or the maximum number of games with --test")
+    parser.add_argument('--test', choices=('sprt', 'confidence'), help="stop a two-agent match once decided")
+    parser.add_argument('--elo0', type=float, default=0, help="SPRT: agent 1 at most this much stronger")
+    parser.add_argument('--elo1', type=float, default=50, help="SPRT: agent 1 at least this much stronger")
+    parser.add_argument('--alpha', type=float, default=0.05)
+    parser.add_argument('--beta', type=float, default=0.05)
+    parser.add_argument('-z', type=float, default=1.96, help="confidence: width of the interval in standard errors")
+    parser.add_argument('--precision', type=float, default=0.05, help="confidence: stop once the score is this exact")
+    parser.add_argument('-j', '--workers', type=int, help="processes, one per CPU by default")
+    parser.add_argument('-o', '--output', default='arena.jsonl', help="results file, resumed if it exists")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--shape', type=int, nargs=2, default=(6, 7), metavar=('ROWS', 'COLUMNS'))
+    args = parser.parse_args()
+    for spec in args.agents:
+        make_agent(spec)  # fail on unknown agents before starting the pool
+
+    start_time = time.time()
+    if args.test:
+        if len(args.agents) != 2:
+            parser.error("--test needs exactly two agents")
+        match = sequential_match(*args.agents, args.games, args.test, args.elo0, args.elo1, args.alpha, args.beta,
+                                 args.z, args.precision, output=args.output, workers=args.workers, seed=args.seed,
+                                 shape=tuple(args.shape))
+        print(f"{match['games']} games in {time.time() - start_time:.1f} s: {args.agents[0]} +{match['wins']} "
+              f"={match['draws']} -{match['losses']}, score {match['score']:.1%}, Elo {match['elo']:+.0f} "
+              f"[{match['elo_interval'][0]:+.0f}, {match['elo_interval'][1]:+.0f}], decision {match['decision']}")
+        return
+    records = run_tournament(args.agents, args.games, args.output, args.workers, args.seed, tuple(args.shape))
+    print(f"{len(records)} games in {time.time() - start_time:.1f} s")
+    print_standings(standings(records))
+
+
+if __name__ == "__main__":
+    main()
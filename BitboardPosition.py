@@ -0,0 +1,391 @@
+import random
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+WIN_SCORE = 1000  # as utility() in the notebook
+
+
+class BitboardPosition:
+    """
+    Connect 4 board of any shape as two bitboards, one per player, with one column every
+    height + 1 bits as in the solver's Position (the spare bit on top of each column keeps
+    alignments from wrapping into the next column).
+
+    It stands in for the notebook's NumPy boards: result() copies a few ints instead of the
+    whole array and terminal() is a handful of shifts. to_numpy() gives the NumPy view (row 0
+    at the top, stones 1 and -1) for agents that want one. The view is cached and kept up to
+    date by play(), so an environment that hands it to the agents every move pays O(1) per move.
+    """
+
+    __slots__ = ('width', 'height', 'stride', 'boards', 'heights', 'moves', 'history', '_array', '_view')
+
+    def __init__(self, width=7, height=6):
+        self.width = width
+        self.height = height
+        self.stride = height + 1
+        self.boards = [0, 0]  # stones of player 1 and of player -1
+        self.heights = [0] * width
+        self.moves = 0
+        self.history = []  # columns played, for undo
+        self._array = None  # cached NumPy board, valid while _view is not None
+        self._view = None
+
+    @classmethod
+    def from_numpy(cls, board):
+        # Position of a notebook board (row 0 at the top, stones 1 and -1)
+        height, width = board.shape
+        position = cls(width, height)
+        for col in range(width):
+            for row in reversed(range(height)):
+                if board[row, col] == 0:
+                    break
+                position.add_stone(col, 1 if board[row, col] == 1 else -1)
+        return position
+
+    def copy(self):
+        position = BitboardPosition.__new__(BitboardPosition)
+        position.width = self.width
+        position.height = self.height
+        position.stride = self.stride
+        position.boards = self.boards[:]
+        position.heights = self.heights[:]
+        position.moves = self.moves
+        position.history = self.history[:]
+        position._array = position._view = None
+        return position
+
+    @property
+    def shape(self):
+        return self.height, self.width
+
+    def to_numpy(self):
+        """Read-only NumPy board, rebuilt only if moves were played or undone since it was cached."""
+        if self._view is None:
+            array = np.zeros((self.height, self.width), dtype=int)
+            for side, stone in ((0, 1), (1, -1)):
+                board = self.boards[side]
+                for col in range(self.width):
+                    for row in range(self.heights[col]):
+                        if board >> (col * self.stride + row) & 1:
+                            array[self.height - 1 - row, col] = stone
+            self._array = array
+            self._view = array.view()
+            self._view.flags.writeable = False
+        return self._view
+
+    def can_play(self, col):
+        col = int(col)
+        return self.heights[col] < self.height
+
+    def actions(self):
+        return [col for col in range(self.width) if self.heights[col] < self.height]
+
+    def add_stone(self, col, player):
+        col = int(col)  # numpy integers (e.g. from np.random.choice) would overflow the shift
+        row = self.heights[col]
+        self.boards[0 if player == 1 else 1] |= 1 << (col * self.stride + row)
+        self.heights[col] = row + 1
+        self.moves += 1
+        self.history.append(col)
+        if self._view is not None:  # keep the cached view in step with the bitboards
+            self._array[self.height - 1 - row, col] = player
+
+    def play(self, col, player=None):
+        # Drop a stone for player, by default the player to move (player 1 moves first)
+        self.add_stone(col, player if player is not None else self.player)
+
+    def undo(self):
+        col = self.history.pop()
+        self.heights[col] -= 1
+        bit = ~(1 << (col * self.stride + self.heights[col]))
+        self.boards[0] &= bit
+        self.boards[1] &= bit
+        self.moves -= 1
+        self._view = None
+
+    @property
+    def player(self):
+        # Player to move, assuming player 1 moved first
+        return 1 if self.moves % 2 == 0 else -1
+
+    def has_won(self, player):
+        board = self.boards[0 if player == 1 else 1]
+        for shift in (1, self.stride - 1, self.stride, self.stride + 1):  # vertical, both diagonals, horizontal
+            pairs = board & (board >> shift)
+            if pairs & (pairs >> 2 * shift):
+                return True
+        return False
+
+    def winner(self):
+        # 1 or -1 if that player has four in a row, else None
+        if self.has_won(1):
+            return 1
+        if self.has_won(-1):
+            return -1
+        return None
+
+    def terminal(self):
+        # (terminal, winner) as terminal() in the notebook, winner 0 for a draw
+        winner = self.winner()
+        if winner is not None:
+            return True, winner
+        if self.moves == self.width * self.height:
+            return True, 0
+        return False, None
+
+    def utility(self):
+        winner = self.winner()
+        return winner * WIN_SCORE if winner is not None else 0
+
+
+def _position(board):
+    return board if isinstance(board, BitboardPosition) else BitboardPosition.from_numpy(board)
+
+
+# Drop-in replacements for the notebook's helpers. They take BitboardPositions, or NumPy boards
+# which are converted first, and result() returns a BitboardPosition.
+
+def empty_board(shape=(6, 7)):
+    return BitboardPosition(shape[1], shape[0])
+
+
+def actions(board):
+    if isinstance(board, BitboardPosition):
+        return board.actions()
+    return [col for col in range(board.shape[1]) if board[0][col] == 0]
+
+
+def result(board, action, player):
+    position = _position(board).copy()
+    position.add_stone(action, player)
+    return position
+
+
+def terminal(board):
+    return _position(board).terminal()
+
+
+def utility(board):
+    return _position(board).utility()
+
+
+def random_player(board, player=1):
+    return int(np.random.choice(actions(board)))
+
+
+def connect4_env(player1, player2, num_games=1000, shape=(6, 7)):
+    """
+    The notebook's connect4_env on a BitboardPosition: the agents still get a NumPy board, the
+    cached view, while moves and the terminal test run on the bitboards.
+    Returns (player 1 wins, player 2 wins, draws).
+    """
+    player1_wins = player2_wins = draws = 0
+    for _ in range(num_games):
+        position = empty_board(shape)
+        current_player = 1
+        while True:
+            agent = player1 if current_player == 1 else player2
+            position.add_stone(agent(position.to_numpy(), player=current_player), current_player)
+            terminal_state, winner = position.terminal()
+            if terminal_state:
+                if winner == 1:
+                    player1_wins += 1
+                elif winner == -1:
+                    player2_wins += 1
+                else:
+                    draws += 1
+                break
+            current_player *= -1
+    return player1_wins, player2_wins, draws
+
+
+# The notebook's NumPy helpers (cells 17 and 21), kept as the baseline of the benchmarks
+
+def numpy_empty_board(shape=(6, 7)):
+    return np.full(shape=shape, fill_value=0)
+
+
+def numpy_result(board, action, player):
+    new_board = board.copy()
+    for row in range(new_board.shape[0] - 1, -1, -1):
+        if new_board[row][action] == 0:
+            new_board[row][action] = player
+            break
+    return new_board
+
+
+def numpy_terminal(board):
+    for player in [-1, 1]:
+        for row in range(board.shape[0]):
+            for col in range(board.shape[1] - 3):
+                if all(board[row][col + i] == 1 for i in range(4)):
+                    return True, 1
+                if all(board[row][col + i] == -1 for i in range(4)):
+                    return True, -1
+        for col in range(board.shape[1]):
+            for row in range(board.shape[0] - 3):
+                if all(board[row + i][col] == player for i in range(4)):
+                    return True, player
+        for row in range(board.shape[0] - 3):
+            for col in range(board.shape[1] - 3):
+                if all(board[row + i][col + i] == player for i in range(4)):
+                    return True, player
+                if all(board[row + i][col + 3 - i] == player for i in range(4)):
+                    return True, player
+    if np.all(board != 0):
+        return True, 0
+    return False, None
+
+
+def numpy_utility(board):
+    terminal_state, winner = numpy_terminal(board)
+    return winner * WIN_SCORE if terminal_state else 0
+
+
+def numpy_connect4_env(player1, player2, num_games=1000, shape=(6, 7)):
+    player1_wins = player2_wins = draws = 0
+    for _ in range(num_games):
+        board = numpy_empty_board(shape)
+        current_player = 1
+        while True:
+            agent = player1 if current_player == 1 else player2
+            board = numpy_result(board, agent(board, player=current_player), current_player)
+            terminal_state, winner = numpy_terminal(board)
+            if terminal_state:
+                if winner == 1:
+                    player1_wins += 1
+                elif winner == -1:
+                    player2_wins += 1
+                else:
+                    draws += 1
+                break
+            current_player *= -1
+    return player1_wins, player2_wins, draws
+
+
+BITBOARD_ENV = SimpleNamespace(from_numpy=BitboardPosition.from_numpy, actions=actions, result=result,
+                               terminal=terminal, utility=utility, connect4_env=connect4_env)
+NUMPY_ENV = SimpleNamespace(from_numpy=lambda board: board, actions=actions, result=numpy_result,
+                            terminal=numpy_terminal, utility=numpy_utility, connect4_env=numpy_connect4_env)
+
+
+class MinimaxABAgent:
+    """
+    The notebook's MinimaxABAgent (cell 24) written against an environment of helpers, the
+    bitboard ones by default. The NumPy board is converted once in choose_action.
+    """
+
+    def __init__(self, depth=4, env=BITBOARD_ENV):
+        self.depth = depth
+        self.env = env
+        self.nodes = 0
+
+    def minimax(self, board, depth, alpha, beta, maximizingPlayer):
+        env = self.env
+        self.nodes += 1
+        terminal_state, _ = env.terminal(board)
+        if depth == 0 or terminal_state:
+            return env.utility(board), None
+
+        best_value = -float('inf') if maximizingPlayer else float('inf')
+        best_action = None
+        for action in env.actions(board):
+            value, _ = self.minimax(env.result(board, action, 1 if maximizingPlayer else -1),
+                                    depth - 1, alpha, beta, not maximizingPlayer)
+            if maximizingPlayer:
+                if value > best_value:
+                    best_value, best_action = value, action
+                alpha = max(alpha, value)
+            else:
+                if value < best_value:
+                    best_value, best_action = value, action
+                beta = min(beta, value)
+            if beta <= alpha:
+                break
+        return best_value, best_action
+
+    def choose_action(self, board, player=1):
+        _, action = self.minimax(self.env.from_numpy(board), self.depth, -float('inf'), float('inf'), player == 1)
+        return action
+
+
+class MonteCarloAgent:
+    """
+    The notebook's MonteCarloAgent (cell 56) on a BitboardPosition: num_simulations random
+    games after every legal column, played and undone in place, and the column with the most
+    wins is chosen. rng is a random.Random, the random module by default.
+    """
+
+    def __init__(self, num_simulations=100, rng=None):
+        self.num_simulations = num_simulations
+        self.rng = rng or random
+
+    def simulate_game(self, position, player):
+        # Winner of a random game from position with player to move, 0 for a draw
+        choice = self.rng.choice
+        played = 0
+        winner = 0
+        while position.moves < position.width * position.height:
+            position.add_stone(choice(position.actions()), player)
+            played += 1
+            if position.has_won(player):
+                winner = player
+                break
+            player = -player
+        for _ in range(played):
+            position.undo()
+        return winner
+
+    def choose_action(self, board, player=1):
+        position = _position(board)
+        win_counts = {}
+        for action in position.actions():
+            position.add_stone(action, player)
+            if position.has_won(player):
+                win_counts[action] = self.num_simulations
+            else:
+                win_counts[action] = sum(self.simulate_game(position, -player) == player
+                                         for _ in range(self.num_simulations))
+            position.undo()
+        return max(win_counts, key=win_counts.get)
+
+
+def benchmark_games(num_games=200, shape=(6, 7), seed=0):
+    """Random-vs-random games per second of connect4_env, NumPy helpers against bitboards."""
+    counts = {}
+    for name, env in (('numpy', NUMPY_ENV), ('bitboard', BITBOARD_ENV)):
+        np.random.seed(seed)  # the same games in both environments
+        start_time = time.time()
+        counts[name] = env.connect4_env(random_player, random_player, num_games, shape)
+        elapsed = time.time() - start_time
+        print(f"{name:>8}: {num_games / elapsed:8.0f} games/s, (wins, losses, draws) = {counts[name]}")
+    assert counts['numpy'] == counts['bitboard']
+
+
+def benchmark_minimax(num_positions=20, move_count=8, depth=4, shape=(6, 7), seed=0):
+    """Nodes per second of MinimaxABAgent on random positions, NumPy helpers against bitboards."""
+    rng = random.Random(seed)
+    boards = []
+    while len(boards) < num_positions:
+        position = empty_board(shape)
+        for _ in range(move_count):
+            position.play(rng.choice(position.actions()))
+        if not position.terminal()[0]:
+            boards.append((position.to_numpy().copy(), position.player))
+
+    chosen = {}
+    for name, env in (('numpy', NUMPY_ENV), ('bitboard', BITBOARD_ENV)):
+        agent = MinimaxABAgent(depth, env)
+        start_time = time.time()
+        chosen[name] = [agent.choose_action(board, player) for board, player in boards]
+        elapsed = time.time() - start_time
+        print(f"{name:>8}: {agent.nodes / elapsed:8.0f} nodes/s, {elapsed / num_positions * 1000:.1f} ms per move")
+    assert chosen['numpy'] == chosen['bitboard']
+
+
+if __name__ == "__main__":
+    benchmark_games()
+    benchmark_minimax()
+    benchmark_minimax(num_positions=10, shape=(4, 4), move_count=4)
@@ -1,37 +1,166 @@
 import subprocess
+import threading
+from collections import deque
+from concurrent.futures import Future
+
 from Connect4GUI import Connect4GUI
 import tkinter as tk
 
 
+class SolverProcess:
+    """
+    A long-lived solver process fed one move string per line on stdin.
+
+    The solver answers every input line with exactly one output line ("moves score nodes time",
+    or an empty line when the moves are invalid), so requests can be pipelined and matched to
+    the answers in order. The process keeps its transposition table between requests. If it
+    dies it is started again and the requests it had not answered are sent again.
+    """
+
+    def __init__(self, command, max_restarts=3):
+        self.command = command
+        self.max_restarts = max_restarts
+        # write_lock keeps the order of pending and of the lines written to stdin the same;
+        # lock guards the state and is never held while blocking on a pipe
+        self.write_lock = threading.Lock()
+        self.lock = threading.Lock()
+        self.process = None
+        self.pending = deque()  # (line, future) in the order they were written
+        self.restarts = 0  # consecutive restarts without any answer in between
+        self.closed = False
+
+    def start(self):
+        # Called with both locks held, returns the unanswered lines to send to the new process
+        self.process = subprocess.Popen(self.command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                        stderr=subprocess.PIPE, text=True, bufsize=1)
+        threading.Thread(target=self.read_output, args=(self.process,), daemon=True).start()
+        threading.Thread(target=self.read_errors, args=(self.process,), daemon=True).start()
+        return [line for line, _ in self.pending]
+
+    def submit(self, line):
+        """Send one move string, returns a Future of the solver's output line."""
+        future = Future()
+        with self.write_lock:
+            with self.lock:
+                if self.closed:
+                    raise RuntimeError("Solver process is closed")
+                resend = []
+                if self.process is None or self.process.poll() is not None:
+                    resend = self.start()
+                self.pending.append((line, future))
+                process = self.process
+            for pending_line in resend + [line]:
+                self.write(process, pending_line)
+        return future
+
+    @staticmethod
+    def write(process, line):
+        try:
+            process.stdin.write(line + '\n')
+            process.stdin.flush()
+        except (BrokenPipeError, OSError):
+            pass  # the output reader sees the process exit and sends the request again
+
+    def read_output(self, process):
+        for output in process.stdout:
+            with self.lock:
+                if process is not self.process or not self.pending:
+                    continue
+                line, future = self.pending.popleft()
+                self.restarts = 0
+            output = output.strip()
+            # "moves score nodes time", without the moves field for the empty board
+            if output and output.split()[:-3] != line.split():
+                future.set_exception(RuntimeError(f"Solver answered {output!r} to {line!r}"))
+            else:
+                future.set_result(output)
+        self.restart(process)
+
+    def restart(self, process):
+        # The process has exited, start a new one if requests are still waiting for answers
+        failed = []
+        with self.write_lock:
+            with self.lock:
+                if process is not self.process or self.closed or not self.pending:
+                    return
+                if self.restarts >= self.max_restarts:
+                    failed = list(self.pending)
+                    self.pending.clear()
+                else:
+                    self.restarts += 1
+                    print(f"Solver process exited, restarting ({self.restarts}/{self.max_restarts})")
+                    resend = self.start()
+                    new_process = self.process
+            if not failed:
+                for line in resend:
+                    self.write(new_process, line)
+        for line, future in failed:
+            future.set_exception(RuntimeError(f"Solver process keeps exiting on {line!r}"))
+
+    def abort(self):
+        """Kill the process and fail the requests it has not answered; the next submit starts a new one."""
+        with self.write_lock:
+            with self.lock:
+                process, self.process = self.process, None
+                failed = list(self.pending)
+                self.pending.clear()
+        if process is not None and process.poll() is None:
+            process.kill()
+        for line, future in failed:
+            future.set_exception(RuntimeError(f"Solve of {line!r} aborted"))
+
+    @staticmethod
+    def read_errors(process):
+        for error in process.stderr:
+            print("Error:", error.strip())
+
+    def close(self):
+        with self.lock:
+            self.closed = True
+            process = self.process
+        if process is not None and process.poll() is None:
+            process.stdin.close()
+            try:
+                process.wait(timeout=1)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
 class CompiledSolverInterface:
     def __init__(self, executable_path):
         self.executable_path = executable_path
+        self.lock = threading.Lock()
+        self.workers = {}  # one persistent process for strong and one for weak solving
 
-    def solve(self, position, weak=False):
-        input_string = position.to_string()
-        command = [self.executable_path]
-        if weak:
-            command.append('-w')
-
-        process = subprocess.Popen(command, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
-                                   text=True)
+    def worker(self, weak):
+        with self.lock:
+            if weak not in self.workers:
+                command = [self.executable_path]
+                if weak:
+                    command.append('-w')
+                self.workers[weak] = SolverProcess(command)
+            return self.workers[weak]
 
-        # Send the input and immediately close stdin to signal end of input
-        process.stdin.write(input_string + '\n')
-        process.stdin.close()
-
-        # Read the output
-        output = process.stdout.read()  # Read all output at once since it's quick
-        stderr = process.stderr.read()
+    def solve(self, position, weak=False):
+        return self.solve_many([position], weak)[0]
 
-        if stderr:
-            print("Error:", stderr)
+    def solve_many(self, positions, weak=False):
+        # All positions are written before the first answer is read
+        worker = self.worker(weak)
+        futures = [worker.submit(position.to_string()) for position in positions]
+        return [self.parse_score(future) for future in futures]
 
-        print("Received output:", output)
+    @staticmethod
+    def parse_score(future):
+        try:
+            output = future.result()
+        except RuntimeError as e:
+            print("Solver failed:", e)
+            return None
 
         if output:
             try:
-                parts = output.strip().split()
+                parts = output.split()
                 score = int(parts[-3])
                 return score
             except (IndexError, ValueError) as e:
@@ -41,6 +170,10 @@ class CompiledSolverInterface:
             print("No valid output received from solver")
             return None
 
+    def close(self):
+        for worker in self.workers.values():
+            worker.close()
+
 
 # Usage in GUI
 if __name__ == "__main__":
@@ -48,7 +181,14 @@ if __name__ == "__main__":
 
     print(struct.calcsize("P") * 8)
 
+    import sys
+    from SolverPool import CompiledBackend, SolverPool
+
+    book_path = sys.argv[1] if len(sys.argv) > 1 else None  # optional opening book from OpeningBook.py
     root = tk.Tk()
-    solver = CompiledSolverInterface('./Connect4Solver.exe')  # Update the path to where you move the executable
+    solver = SolverPool(CompiledBackend('./Connect4Solver.exe'), book_path)  # Update the path to where you move the executable
     app = Connect4GUI(root, solver)
-    root.mainloop()
+    try:
+        root.mainloop()
+    finally:
+        solver.close()
@@ -1,3 +1,4 @@
+import queue
 import tkinter as tk
 from tkinter import messagebox
 
@@ -6,6 +7,9 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from matplotlib.figure import Figure
 import numpy as np
 
+POLL_MS = 50  # how often the Tk loop picks up finished column scores
+
+
 class GameState:
     def __init__(self, width=7, height=6):
         self.width = width
@@ -38,9 +42,21 @@ class GameState:
 
 
 class Connect4GUI:
+    """
+    Board, per-column score labels and move buttons. Analysis never blocks the Tk loop: the
+    columns of the current position are solved by the SolverPool's backend, each result is
+    queued from whichever thread finishes it and shown by a poll on the Tk loop, and a move
+    cancels the analysis of the previous position. The pool caches results per position.
+    """
+
     def __init__(self, master, solver, width=7, height=6):
         self.master = master
-        self.solver = solver
+        self.solver = solver  # a SolverPool, scores all columns of a position at once
+        self.futures = {}  # column -> Future of (score, nodes, seconds) for the current position
+        self.scores = [None] * width  # scores of the current position that have arrived
+        self.generation = 0  # bumped on every move, results of older analyses are dropped
+        self.results = queue.Queue()  # (generation, column, Future) filled by solver threads
+        self.ai_pending = False  # the AI moves once every column of the current position is scored
         self.width = width
         self.height = height
         self.position = GameState(width, height)  # Use GameState instead
@@ -67,29 +83,59 @@ class Connect4GUI:
         self.ai_button.pack(side=tk.BOTTOM)
 
         self.draw_board()
+        self.update_move_scores()
+        self.master.after(POLL_MS, self.poll_results)
 
     def make_move(self, col):
         if not self.position.can_play(col):
             messagebox.showerror("Invalid move", "Column is full!")
             return
+        self.ai_pending = False  # the user moved instead
+        self.ai_button.config(state=tk.NORMAL)
+        self.play(col)
+
+    def play(self, col):
         self.position.make_move(col)
         self.draw_board()
+        if self.is_game_over():
+            self.end_game()
+            return
         self.update_move_scores()
 
     def update_move_scores(self):
-        scores = []
+        """Start scoring the columns of the current position; labels fill in as results arrive."""
+        for future in self.futures.values():
+            future.cancel()  # stale: queued solves are dropped, running ones stopped if the backend can
+        self.generation += 1
+        self.scores = [None] * self.width
+        self.futures = self.solver.submit_columns(self.position.moves, self.width, self.height)
         for col in range(self.width):
-            if self.position.can_play(col) and (0 == 1):
-                test_position = GameState()
-                test_position.moves = self.position.moves.copy()
-                test_position.make_move(col)
-                score = self.solver.solve(test_position, weak=False)
-                scores.append(score)
-            else:
-                scores.append('-')
-        for i, score in enumerate(scores):
-            self.score_labels[i].config(text=f"Score: {score}")
-
+            self.score_labels[col].config(text="Score: ..." if col in self.futures else "Score: -")
+        for col, future in self.futures.items():
+            future.add_done_callback(lambda future, col=col, generation=self.generation:
+                                     self.results.put((generation, col, future)))
+
+    def poll_results(self):
+        # Runs on the Tk loop: show the scores that arrived since the last poll
+        while True:
+            try:
+                generation, col, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.generation or future.cancelled():
+                continue
+            try:
+                self.scores[col], _, _ = future.result()
+                self.score_labels[col].config(text=f"Score: {self.scores[col]}")
+            except (RuntimeError, ValueError) as e:
+                print(f"Column {col + 1} failed:", e)
+                self.score_labels[col].config(text="Score: ?")
+                self.futures.pop(col)
+        if self.ai_pending and all(self.scores[col] is not None for col in self.futures):
+            self.ai_pending = False
+            self.ai_button.config(state=tk.NORMAL)
+            self.play_best_move()
+        self.master.after(POLL_MS, self.poll_results)
 
 
     def draw_board(self):
@@ -114,34 +160,20 @@ class Connect4GUI:
         self.canvas.draw()
 
     def ai_move(self):
-        best_move, best_score = None, -float('inf')
-        # Iterate over each column to simulate the move and evaluate it using the solver
-        for col in range(self.width):
-            if self.position.can_play(col):
-                # Simulate the move
-                test_position = GameState(self.width, self.height)
-                test_position.moves = self.position.moves.copy()  # Copy current moves
-                test_position.make_move(col)
-
-                # Convert the game state to the input string format expected by the solver
-                # game_state_string = test_position.to_string()
-
-                # Get the score from the solver
-                score = self.solver.solve(test_position, weak=False)
-                if score is not None and score > best_score:
-                    best_score = score
-                    best_move = col
-
-        if best_move is not None:
-            self.position.make_move(best_move)
-            self.draw_board()
-            self.update_move_scores()
-
-            # Check for end of game
-            if self.is_game_over():
-                self.end_game()
-        else:
+        # The move is played by poll_results once the running analysis has scored every column
+        if not self.futures:
+            messagebox.showinfo("Move", "AI has no moves left.")
+            return
+        self.ai_pending = True
+        self.ai_button.config(state=tk.DISABLED)
+
+    def play_best_move(self):
+        # Scores are for the player to move
+        scored = [col for col in self.futures if self.scores[col] is not None]
+        if not scored:
             messagebox.showinfo("Move", "AI has no moves left.")
+            return
+        self.play(max(scored, key=lambda col: self.scores[col]))
 
     def is_game_over(self):
         # Check if the game has ended
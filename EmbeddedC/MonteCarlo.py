@@ -1,41 +1,175 @@
 import random
+import time
+
+import numpy as np
+
+
+class RolloutEngine:
+    """
+    Plays random games to the end for many boards at once.
+
+    Boards are NumPy uint64 bitboards with one column every height + 1 bits (as in the
+    solver's Position): current holds the stones of the player to move, mask all stones.
+    All boards of a batch start from the same position, so they are always at the same ply
+    and a single random draw per step picks a legal column for every board.
+    """
+
+    def __init__(self, width=7, height=6, rng=None):
+        if width * (height + 1) > 64:
+            raise ValueError("Board does not fit in a 64-bit bitboard")
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng() if rng is None else rng
+        cols = np.arange(width, dtype=np.uint64) * np.uint64(height + 1)
+        self.bottom = np.uint64(1) << cols
+        self.top = np.uint64(1 << (height - 1)) << cols
+        self.column = np.uint64((1 << height) - 1) << cols
+
+    def position(self, moves):
+        # (current, mask) of the position reached by a list of 0-based columns
+        current, mask = 0, 0
+        for col in moves:
+            current ^= mask
+            mask |= mask + int(self.bottom[col])
+        return current, mask
+
+    def alignment(self, pos):
+        # True for every bitboard that contains four in a row
+        won = np.zeros(len(pos), dtype=bool)
+        for shift in (1, self.height + 1, self.height, self.height + 2):
+            m = pos & (pos >> np.uint64(shift))
+            won |= (m & (m >> np.uint64(2 * shift))) != 0
+        return won
+
+    def rollouts(self, moves, candidates, num_simulations):
+        """
+        Play num_simulations random games after each candidate column.
+        Returns (wins, draws, losses) arrays of length width, counted for the player to move.
+        """
+        wins = np.zeros(self.width, dtype=np.int64)
+        draws = np.zeros(self.width, dtype=np.int64)
+        losses = np.zeros(self.width, dtype=np.int64)
+        candidates = np.asarray(candidates, dtype=np.int64)
+        if len(candidates) == 0:
+            return wins, draws, losses
+
+        start_current, start_mask = self.position(moves)
+        nb_moves = len(moves)
+        candidate = np.repeat(candidates, num_simulations)
+        current = np.full(len(candidate), start_current, dtype=np.uint64)
+        mask = np.full(len(candidate), start_mask, dtype=np.uint64)
+
+        outcome = np.zeros(len(candidate), dtype=np.int8)  # 1 win, 0 draw, -1 loss
+        index = np.arange(len(candidate))  # boards still being played
+        cols = candidate
+        sign = 1  # the player to move plays the candidate move
+        while True:
+            move = (mask + self.bottom[cols]) & self.column[cols]
+            current ^= mask
+            mask |= move
+            nb_moves += 1
+
+            won = self.alignment(current ^ mask)  # stones of the player who just moved
+            outcome[index[won]] = sign
+            running = ~won
+            if nb_moves == self.width * self.height or not running.any():
+                break
+            index, current, mask = index[running], current[running], mask[running]
+
+            # uniform random legal column per board: the largest random key among legal columns
+            legal = (mask[:, None] & self.top[None, :]) == 0
+            keys = np.where(legal, self.rng.random((len(index), self.width)), -1.0)
+            cols = keys.argmax(axis=1)
+            sign = -sign
+
+        np.add.at(wins, candidate[outcome == 1], 1)
+        np.add.at(draws, candidate[outcome == 0], 1)
+        np.add.at(losses, candidate[outcome == -1], 1)
+        return wins, draws, losses
+
+
+def scalar_rollouts(engine, moves, candidates, num_simulations):
+    # Reference implementation playing one random game at a time on Python int bitboards
+    width, height = engine.width, engine.height
+    bottom = [int(b) for b in engine.bottom]
+    top = [int(t) for t in engine.top]
+    wins, draws, losses = [0] * width, [0] * width, [0] * width
+    start_current, start_mask = engine.position(moves)
+
+    def alignment(pos):
+        for shift in (1, height + 1, height, height + 2):
+            m = pos & (pos >> shift)
+            if m & (m >> (2 * shift)):
+                return True
+        return False
+
+    for candidate in candidates:
+        for _ in range(num_simulations):
+            current, mask, nb_moves = start_current, start_mask, len(moves)
+            col, sign, outcome = candidate, 1, 0
+            while True:
+                current ^= mask
+                mask |= mask + bottom[col]
+                nb_moves += 1
+                if alignment(current ^ mask):
+                    outcome = sign
+                    break
+                if nb_moves == width * height:
+                    break
+                col = random.choice([c for c in range(width) if not mask & top[c]])
+                sign = -sign
+            if outcome == 1:
+                wins[candidate] += 1
+            elif outcome == -1:
+                losses[candidate] += 1
+            else:
+                draws[candidate] += 1
+    return wins, draws, losses
 
 
 class MonteCarloAgent:
-    def __init__(self, num_simulations=1000):
+    def __init__(self, num_simulations=1000, seed=None):
         self.num_simulations = num_simulations
+        self.rng = np.random.default_rng(seed)
+        self.engines = {}
+
+    def engine(self, width, height):
+        if (width, height) not in self.engines:
+            self.engines[width, height] = RolloutEngine(width, height, self.rng)
+        return self.engines[width, height]
+
+    def rollouts(self, game_state):
+        # win/draw/loss counts per column for the player to move in game_state
+        legal_moves = [col for col in range(game_state.width) if game_state.can_play(col)]
+        engine = self.engine(game_state.width, game_state.height)
+        return engine.rollouts(game_state.moves, legal_moves, self.num_simulations)
 
     def solve(self, game_state):
         legal_moves = [col for col in range(game_state.width) if game_state.can_play(col)]
-        wins = [0] * game_state.width
-        total_simulations = 0
-
-        for move in legal_moves:
-            total_wins = 0
-            for _ in range(self.num_simulations):
-                test_state = game_state.clone()  # Make a copy of the game state for simulation
-                test_state.make_move(move)
-                result = self.simulate_game(test_state)
-                if result == 1:
-                    total_wins += 1
-                elif result == -1:
-                    total_wins -= 1
-            wins[move] = total_wins
-            total_simulations += self.num_simulations
-
-        probabilities = [win / total_simulations for win in wins]
-        best_move = legal_moves[probabilities.index(max(probabilities))]
-        return best_move
-
-    def simulate_game(self, game_state):
-        while not game_state.is_game_over():
-            legal_moves = [col for col in range(game_state.width) if game_state.can_play(col)]
-            move = random.choice(legal_moves)
-            game_state.make_move(move)
-
-        if game_state.is_draw():
-            return 0
-        elif game_state.get_winner() == 1:
-            return 1
-        else:
-            return -1
+        if not legal_moves:
+            return None
+        wins, draws, losses = self.rollouts(game_state)
+        return max(legal_moves, key=lambda col: wins[col] - losses[col])
+
+
+def benchmark_rollouts(simulation_counts=(1000, 10000, 100000), moves=(3, 3, 2, 4)):
+    engine = RolloutEngine()
+    candidates = [col for col in range(engine.width)]
+    for num_simulations in simulation_counts:
+        total = num_simulations * len(candidates)
+        start_time = time.time()
+        engine.rollouts(list(moves), candidates, num_simulations)
+        batch_rate = total / (time.time() - start_time)
+
+        # the scalar loop is timed on a sample so that 100k simulations stay practical
+        scalar_simulations = min(num_simulations, 1000)
+        start_time = time.time()
+        scalar_rollouts(engine, list(moves), candidates, scalar_simulations)
+        scalar_rate = scalar_simulations * len(candidates) / (time.time() - start_time)
+
+        print(f"{num_simulations} simulations per move: batch {batch_rate:.0f} rollouts/s, "
+              f"scalar {scalar_rate:.0f} rollouts/s ({batch_rate / scalar_rate:.1f}x)")
+
+
+if __name__ == "__main__":
+    benchmark_rollouts()
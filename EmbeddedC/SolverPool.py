@@ -0,0 +1,220 @@
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+
+from CompiledSolverInterface import SolverProcess
+
+SOLVER_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'Implementation 3')
+
+_solver = None  # per worker process, so every worker keeps its transposition table warm
+
+
+def _init_python_worker(solver_dir, book_path, table_path):
+    global _solver
+    sys.path.insert(0, solver_dir)
+    from Solver import Solver
+    from OpeningBook import Book
+    from TranspositionTable import TranspositionTable
+    _solver = Solver(trans_table=TranspositionTable.load(table_path) if table_path else None,
+                     book=Book(book_path) if book_path else None)
+
+
+def _solve_python(moves, weak):
+    from Position import Position
+    position = Position()
+    if position.play(moves) != len(moves):
+        raise ValueError(f"Invalid move sequence: {moves}")
+    nodes = _solver.node_count
+    start_time = time.time()
+    score = _solver.solve(position, weak)
+    return score, _solver.node_count - nodes, time.time() - start_time
+
+
+class PythonBackend:
+    """
+    Implementation 3's Solver in a pool of worker processes. table_path starts every worker
+    from a transposition table saved by TranspositionTable.save instead of an empty one.
+    """
+
+    def __init__(self, workers=None, solver_dir=SOLVER_DIR, book_path=None, table_path=None):
+        self.executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=_init_python_worker,
+                                            initargs=(solver_dir, book_path, table_path))
+
+    def submit(self, moves, weak=False):
+        # Future of (score, nodes, seconds) for the player to move after moves
+        return self.executor.submit(_solve_python, moves, weak)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+
+
+class CompiledBackend:
+    """
+    Several persistent compiled solver processes. Requests wait in a queue until a process is
+    idle, so a request cancelled while it waits is never sent; cancelling one that is being
+    solved kills its process, which is started again (with an empty table) on the next request.
+    """
+
+    def __init__(self, executable_path, workers=None):
+        self.executable_path = executable_path
+        self.num_workers = workers or os.cpu_count()
+        self.workers = {}  # weak flag -> list of SolverProcess
+        self.queue = deque()  # (moves, weak, Future) not sent yet
+        self.lock = threading.Lock()
+
+    def submit(self, moves, weak=False):
+        result = Future()
+        with self.lock:
+            self.queue.append((moves, weak, result))
+        self.dispatch()
+        return result
+
+    def dispatch(self):
+        # Send queued requests, in order, while their solver processes have an idle one
+        while True:
+            with self.lock:
+                while self.queue and self.queue[0][2].cancelled():
+                    self.queue.popleft()
+                if not self.queue:
+                    return
+                moves, weak, result = self.queue[0]
+                if weak not in self.workers:
+                    command = [self.executable_path] + (['-w'] if weak else [])
+                    self.workers[weak] = [SolverProcess(command) for _ in range(self.num_workers)]
+                idle = [worker for worker in self.workers[weak] if not worker.pending]
+                if not idle:
+                    return
+                self.queue.popleft()
+                worker = idle[0]
+                output_future = worker.submit(moves)
+
+            def parse(output_future, moves=moves, result=result):
+                try:
+                    output = output_future.result()
+                    if not output:
+                        raise ValueError(f"Invalid move sequence: {moves}")
+                    score, nodes, microseconds = (int(part) for part in output.split()[-3:])
+                    result.set_result((score, nodes, microseconds / 1e6))
+                except (RuntimeError, ValueError) as e:
+                    if not result.done():
+                        result.set_exception(e)
+                except InvalidStateError:
+                    pass  # cancelled while it was being solved
+                self.dispatch()
+
+            output_future.add_done_callback(parse)
+            result.add_done_callback(lambda result, worker=worker: result.cancelled() and worker.abort())
+
+    def close(self):
+        with self.lock:
+            for _, _, result in self.queue:
+                result.cancel()
+            self.queue.clear()
+        for workers in self.workers.values():
+            for worker in workers:
+                worker.close()
+
+
+def is_winning_move(moves, col, width, height):
+    # True if playing col after the 0-based columns in moves completes four in a row
+    current, mask = 0, 0
+    for c in moves:
+        current ^= mask
+        mask |= mask + (1 << c * (height + 1))
+    current |= (mask + (1 << col * (height + 1))) & (((1 << height) - 1) << col * (height + 1))
+    for shift in (1, height + 1, height, height + 2):
+        m = current & (current >> shift)
+        if m & (m >> (2 * shift)):
+            return True
+    return False
+
+
+class SolverPool:
+    """
+    Scores every legal column of a position by solving the child positions concurrently,
+    so analysing a position takes as long as its slowest column instead of the sum of all.
+    Child scores are cached, so analysing a position again costs nothing.
+    """
+
+    def __init__(self, backend, book_path=None):
+        self.backend = backend
+        self.cache = {}  # (child move string, weak) -> (score, nodes, seconds) for the player to move
+        self.last_time = 0.0  # wall time of the last analyze()
+        self.book = None  # opening book answering early positions without the backend
+        if book_path is not None:
+            sys.path.insert(0, SOLVER_DIR)
+            from OpeningBook import Book
+            self.book = Book(book_path)
+
+    def submit_columns(self, moves, width=7, height=6, weak=False):
+        """
+        Start solving every legal column after moves (a list of 0-based columns).
+        Returns {column: Future of (score, nodes, seconds)} with scores for the player to move.
+        Cancelling a future drops its solve if the backend has not started it yet.
+        """
+        futures = {}
+        for col in range(width):
+            if moves.count(col) >= height:
+                continue
+            if is_winning_move(moves, col, width, height):
+                futures[col] = Future()
+                score = 1 if weak else (width * height + 1 - len(moves)) // 2  # as Solver.solve_bounded
+                futures[col].set_result((score, 0, 0.0))
+                continue
+            child = Future()
+            futures[col] = child
+            child_moves = ''.join(str(c + 1) for c in moves + [col])
+
+            if (child_moves, weak) in self.cache:
+                child.set_result(self.cache[child_moves, weak])
+                continue
+            book_score = self.book.get_sequence(child_moves) if self.book is not None and not weak else None
+            if book_score is not None:
+                child.set_result((-book_score, 0, 0.0))
+                continue
+
+            def negate(future, child=child, key=(child_moves, weak)):
+                # the solver scores the child position for the opponent
+                if future.cancelled():
+                    return
+                try:
+                    score, nodes, seconds = future.result()
+                    self.cache[key] = (-score, nodes, seconds)  # kept even if nobody waits for it any more
+                    child.set_result(self.cache[key])
+                except (RuntimeError, ValueError) as e:
+                    if not child.done():
+                        child.set_exception(e)
+                except InvalidStateError:
+                    pass  # child was cancelled while it was being solved
+
+            backend_future = self.backend.submit(child_moves, weak)
+            child.add_done_callback(lambda child, backend_future=backend_future:
+                                    child.cancelled() and backend_future.cancel())
+            backend_future.add_done_callback(negate)
+        return futures
+
+    def analyze(self, moves, width=7, height=6, weak=False):
+        """
+        Score every column after moves. Returns a list of width entries, None for full columns,
+        else a dict with the column's score (for the player to move), nodes searched and seconds taken.
+        """
+        start_time = time.time()
+        futures = self.submit_columns(moves, width, height, weak)
+        analysis = [None] * width
+        for col, future in futures.items():
+            try:
+                score, nodes, seconds = future.result()
+            except (RuntimeError, ValueError) as e:
+                print(f"Column {col + 1} failed:", e)
+                continue
+            analysis[col] = {'score': score, 'nodes': nodes, 'time': seconds}
+        self.last_time = time.time() - start_time
+        return analysis
+
+    def close(self):
+        self.backend.close()
+        if self.book is not None:
+            self.book.close()
@@ -0,0 +1,55 @@
+import sys
+import unittest
+
+from CompiledSolverInterface import CompiledSolverInterface, SolverProcess
+
+# Stands in for the compiled solver: answers "moves score nodes time", where the moves field is
+# empty (so the line starts with the score) for the empty board, and an empty line for bad moves
+FAKE_SOLVER = '''
+import sys
+for line in sys.stdin:
+    moves = line.strip()
+    if not all(char in "1234567" for char in moves):
+        print(flush=True)
+    else:
+        print(f"{moves} {len(moves) - 1} 10 5".strip(), flush=True)
+'''
+
+
+class SolverProcessTest(unittest.TestCase):
+    def setUp(self):
+        self.solver = SolverProcess([sys.executable, '-c', FAKE_SOLVER])
+
+    def tearDown(self):
+        self.solver.close()
+
+    def test_empty_board(self):
+        self.assertEqual(self.solver.submit('').result(timeout=10), '-1 10 5')
+
+    def test_moves_are_echoed(self):
+        futures = [self.solver.submit(moves) for moves in ('', '4', '44', '')]
+        self.assertEqual([future.result(timeout=10) for future in futures],
+                         ['-1 10 5', '4 0 10 5', '44 1 10 5', '-1 10 5'])
+
+    def test_invalid_moves(self):
+        self.assertEqual(self.solver.submit('48').result(timeout=10), '')
+
+
+
+class EmptyPosition:
+    def to_string(self):
+        return ''
+
+
+class CompiledSolverInterfaceTest(unittest.TestCase):
+    def test_solve_empty_board(self):
+        interface = CompiledSolverInterface('unused')
+        interface.workers[False] = SolverProcess([sys.executable, '-c', FAKE_SOLVER])
+        try:
+            self.assertEqual(interface.solve(EmptyPosition()), -1)
+        finally:
+            interface.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
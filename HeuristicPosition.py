@@ -0,0 +1,256 @@
+import time
+
+import numpy as np
+
+from SearchControl import SearchAborted
+
+WIN_SCORE = 1000  # as utility() in the notebook
+WINDOW_WEIGHTS = (0, 0, 2, 5, 0)  # by stones in a window the opponent has not blocked, four is a win
+CENTER_WEIGHT = 3  # per stone in the center column
+
+
+def window_masks(width=7, height=6):
+    """
+    Bitboard masks of every four-cell window, with one column every height + 1 bits as in the
+    solver's Position. A 7x6 board has 69: 24 horizontal, 21 vertical and 24 diagonal.
+    """
+    stride = height + 1
+    masks = []
+    for col in range(width):
+        for row in range(height):
+            for dcol, drow in ((1, 0), (0, 1), (1, 1), (1, -1)):
+                end_col, end_row = col + 3 * dcol, row + 3 * drow
+                if end_col < width and 0 <= end_row < height:
+                    masks.append(sum(1 << ((col + k * dcol) * stride + row + k * drow) for k in range(4)))
+    return masks
+
+
+class HeuristicPosition:
+    """
+    Bitboard position that keeps the heuristic evaluation up to date as moves are played.
+
+    For every window and side it counts the side's stones, and for every side how many windows
+    it has with 0..4 stones and no opponent stone. play() and undo() only touch the windows
+    through the played cell, so evaluate() is O(1). Sides are 0 for player 1 and 1 for player -1,
+    scores are for player 1 as in the notebook's utility().
+
+    It is a class of its own rather than a position_class() Position from Implementation 3: the
+    notebook's players are explicitly 1 and -1 rather than whoever is to move, the window counts
+    need each side's stones on a separate board where Position keeps current player and mask,
+    and the notebook's boards can be any shape while the evaluation needs its own window masks.
+    A root-level module also cannot import from Implementation 3 without editing sys.path.
+    """
+
+    def __init__(self, width=7, height=6, player=1):
+        self.width = width
+        self.height = height
+        self.stride = height + 1
+        self.masks = window_masks(width, height)
+        self.cell_windows = [[] for _ in range(width * self.stride)]  # window indices through each cell
+        for w, mask in enumerate(self.masks):
+            for bit in range(width * self.stride):
+                if mask >> bit & 1:
+                    self.cell_windows[bit].append(w)
+        self.center = ((1 << height) - 1) << (width // 2) * self.stride if width % 2 else 0
+        self.boards = [0, 0]
+        self.mask = 0
+        self.heights = [0] * width
+        self.stones = [[0] * len(self.masks), [0] * len(self.masks)]
+        self.open_windows = [[len(self.masks), 0, 0, 0, 0], [len(self.masks), 0, 0, 0, 0]]
+        self.score = 0
+        self.player = player  # to move
+        self.moves = 0
+        self.history = []  # columns played, for undo
+        # center-first column order for move ordering
+        self.column_order = sorted(range(width), key=lambda col: abs(col - width // 2))
+
+    @classmethod
+    def from_board(cls, board, player=1):
+        # Position of a notebook board (row 0 at the top, stones 1 and -1) with player to move
+        height, width = board.shape
+        position = cls(width, height, player)
+        for col in range(width):
+            for row in reversed(range(height)):
+                if board[row, col] == 0:
+                    break
+                position.add_stone(0 if board[row, col] == 1 else 1, col)
+        return position
+
+    def add_stone(self, side, col):
+        bit = col * self.stride + self.heights[col]
+        self.heights[col] += 1
+        self.boards[side] |= 1 << bit
+        self.mask |= 1 << bit
+        self.moves += 1
+        own, other = self.stones[side], self.stones[1 - side]
+        own_open, other_open = self.open_windows[side], self.open_windows[1 - side]
+        delta = 0
+        for w in self.cell_windows[bit]:
+            a, b = own[w], other[w]
+            own[w] = a + 1
+            if b == 0:  # still open for side, it gains a stone
+                own_open[a] -= 1
+                own_open[a + 1] += 1
+                delta += WINDOW_WEIGHTS[a + 1] - WINDOW_WEIGHTS[a]
+            if a == 0:  # was open for the opponent, now blocked
+                other_open[b] -= 1
+                delta += WINDOW_WEIGHTS[b]
+        if self.center >> bit & 1:
+            delta += CENTER_WEIGHT
+        self.score += delta if side == 0 else -delta
+
+    def remove_stone(self, side, col):
+        self.heights[col] -= 1
+        bit = col * self.stride + self.heights[col]
+        self.boards[side] &= ~(1 << bit)
+        self.mask &= ~(1 << bit)
+        self.moves -= 1
+        own, other = self.stones[side], self.stones[1 - side]
+        own_open, other_open = self.open_windows[side], self.open_windows[1 - side]
+        delta = 0
+        for w in self.cell_windows[bit]:
+            a, b = own[w] - 1, other[w]
+            own[w] = a
+            if b == 0:
+                own_open[a + 1] -= 1
+                own_open[a] += 1
+                delta += WINDOW_WEIGHTS[a + 1] - WINDOW_WEIGHTS[a]
+            if a == 0:  # unblocked, open for the opponent again
+                other_open[b] += 1
+                delta += WINDOW_WEIGHTS[b]
+        if self.center >> bit & 1:
+            delta += CENTER_WEIGHT
+        self.score -= delta if side == 0 else -delta
+
+    def can_play(self, col):
+        return self.heights[col] < self.height
+
+    def actions(self):
+        return [col for col in self.column_order if self.heights[col] < self.height]
+
+    def play(self, col):
+        self.add_stone(0 if self.player == 1 else 1, col)
+        self.history.append(col)
+        self.player = -self.player
+
+    def undo(self):
+        self.player = -self.player
+        self.remove_stone(0 if self.player == 1 else 1, self.history.pop())
+
+    def winner(self):
+        # 1 or -1 if that player has four in a row, else None
+        if self.open_windows[0][4]:
+            return 1
+        if self.open_windows[1][4]:
+            return -1
+        return None
+
+    def terminal(self):
+        return self.winner() is not None or self.moves == self.width * self.height
+
+    def evaluate(self):
+        # Score for player 1: +-WIN_SCORE for a win, 0 for a draw, else the window heuristic
+        winner = self.winner()
+        if winner is not None:
+            return winner * WIN_SCORE
+        if self.moves == self.width * self.height:
+            return 0
+        return self.score
+
+    def full_evaluation(self):
+        # The same score recomputed from scratch over every window, to check the incremental one
+        score = 0
+        for mask in self.masks:
+            for side, sign in ((0, 1), (1, -1)):
+                if not mask & self.boards[1 - side]:
+                    score += sign * WINDOW_WEIGHTS[bin(mask & self.boards[side]).count('1')]
+        for side, sign in ((0, 1), (1, -1)):
+            score += sign * CENTER_WEIGHT * bin(self.center & self.boards[side]).count('1')
+        return score
+
+
+class HeuristicBitboardAgent:
+    """Depth-limited alpha-beta on a HeuristicPosition, same choose_action API as the notebook agents."""
+
+    def __init__(self, depth=4):
+        self.depth = depth
+        self.control = None  # SearchControl of the running choose_action
+
+    def minimax(self, position, depth, alpha, beta):
+        if self.control is not None:
+            self.control.check()  # raises SearchAborted once the time or node budget is spent
+        if depth == 0 or position.terminal():
+            return position.evaluate(), None
+
+        maximizing = position.player == 1
+        best_value = -float('inf') if maximizing else float('inf')
+        best_action = None
+        for action in position.actions():
+            position.play(action)
+            try:
+                value, _ = self.minimax(position, depth - 1, alpha, beta)
+            finally:
+                position.undo()
+            if maximizing:
+                if value > best_value:
+                    best_value, best_action = value, action
+                alpha = max(alpha, value)
+            else:
+                if value < best_value:
+                    best_value, best_action = value, action
+                beta = min(beta, value)
+            if beta <= alpha:
+                break
+        return best_value, best_action
+
+    def choose_action(self, board, player=1, control=None):
+        position = HeuristicPosition.from_board(board, player)
+        if control is None:
+            _, action = self.minimax(position, self.depth, -float('inf'), float('inf'))
+            return action
+        # Under a SearchControl deepen one ply at a time and keep the move of the last completed depth
+        self.control = control
+        action = position.actions()[0]
+        try:
+            for depth in range(1, self.depth + 1):
+                _, action = self.minimax(position, depth, -float('inf'), float('inf'))
+        except SearchAborted:
+            pass
+        finally:
+            self.control = None
+        return action
+
+
+def benchmark_evaluation(num_positions=1000, move_count=20, seed=0):
+    """Evaluations per second, incremental evaluate() against full_evaluation() over all windows."""
+    rng = np.random.default_rng(seed)
+    position = HeuristicPosition()
+    positions = []
+    while len(positions) < num_positions:
+        while position.moves:
+            position.undo()
+        for _ in range(move_count):
+            position.play(int(rng.choice(position.actions())))
+            if position.terminal():
+                break
+        if not position.terminal():
+            assert position.evaluate() == position.full_evaluation()
+            positions.append(list(position.history))
+
+    for name, evaluate in (('incremental', HeuristicPosition.evaluate),
+                           ('full', HeuristicPosition.full_evaluation)):
+        elapsed = 0.0
+        for moves in positions:
+            while position.moves:
+                position.undo()
+            for col in moves:
+                position.play(col)
+            start_time = time.time()
+            for _ in range(100):
+                evaluate(position)
+            elapsed += time.time() - start_time
+        print(f"{name:>11}: {100 * num_positions / elapsed:.0f} evaluations/s")
+
+
+if __name__ == "__main__":
+    benchmark_evaluation()
@@ -1,25 +1,44 @@
+import os
 import random
+import sys
 import time
 
 import numpy as np
 from matplotlib import pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # for the shared SearchControl
+
+from SearchControl import SearchAborted, SearchResult
 from TranspositionTable import TranspositionTable
 
 
 class MoveSorter:
-    def __init__(self):
-        self.entries = []  # List to store moves and their scores
+    def __init__(self, width=7):
+        # Preallocated parallel lists kept in ascending score order, the best move is last
+        self.moves = [0] * width
+        self.scores = [0] * width
+        self.size = 0
 
     def add(self, move, score):
-        self.entries.append((score, move))
-        self.entries.sort(reverse=True, key=lambda x: x[0])  # Sort by score in descending order
+        # Insert from the back, only the entries with a higher score are shifted
+        pos = self.size
+        self.size += 1
+        while pos and self.scores[pos - 1] > score:
+            self.moves[pos] = self.moves[pos - 1]
+            self.scores[pos] = self.scores[pos - 1]
+            pos -= 1
+        self.moves[pos] = move
+        self.scores[pos] = score
 
     def getNext(self):
-        if self.entries:
-            return self.entries.pop(0)[1]
+        if self.size:
+            self.size -= 1
+            return self.moves[self.size]
         return 0
 
+    def reset(self):
+        self.size = 0
+
 
 
 class Position:
@@ -34,8 +53,11 @@ class Position:
         self.move_sequence = None
         self.current_position = 0  # Bitboard for current player
         self.mask = 0  # Bitboard for all discs
+        self.mirror_position = 0  # Bitboards of the left-right mirror image
+        self.mirror_mask = 0
         self.moves = 0  # Number of moves played
         self.node_count = 0  # Initialize node count
+        self.history = []  # Undo stack of the bitboards before each move
 
     def increment_node_count(self):
         self.node_count += 1
@@ -44,10 +66,18 @@ class Position:
         """ Play a move in the given column. """
         if not self.can_play(col):
             raise ValueError("Column is full or move is illegal")
+        self.history.append((self.current_position, self.mask, self.mirror_position, self.mirror_mask))
         self.current_position ^= self.mask
         self.mask |= self.mask + self.bottom_mask(col)
+        self.mirror_position ^= self.mirror_mask
+        self.mirror_mask |= self.mirror_mask + self.bottom_mask(Position.WIDTH - 1 - col)
         self.moves += 1
 
+    def undo(self):
+        """ Take back the last move played. """
+        self.current_position, self.mask, self.mirror_position, self.mirror_mask = self.history.pop()
+        self.moves -= 1
+
     def can_play(self, col):
         """ Check if a move can be played in the given column. """
         return (self.mask & self.top_mask(col)) == 0
@@ -142,15 +172,18 @@ class Position:
         return possible_mask & ~(opponent_win >> 1)  # Avoid playing under opponent winning spot.
 
     def key(self):
-        """ Generate a unique key for the current position which is used for the transposition table. """
-        return self.current_position + self.mask
+        """ Generate a unique key shared by the position and its mirror image, used for the transposition table. """
+        return min(self.current_position + self.mask, self.mirror_position + self.mirror_mask)
 
     def popcount(m):
         return m.bit_count()
     def clone(self):
+        # Without the undo history: the clone cannot undo past this position, but cloning stays O(1)
         new_pos = Position()
         new_pos.current_position = self.current_position
         new_pos.mask = self.mask
+        new_pos.mirror_position = self.mirror_position
+        new_pos.mirror_mask = self.mirror_mask
         new_pos.moves = self.moves
         return new_pos
 
@@ -225,8 +258,10 @@ def visualize(board):
     plt.show()
 
 
-def negamax(position, alpha, beta, trans_table):
+def negamax(position, alpha, beta, trans_table, control=None):
     position.increment_node_count()
+    if control is not None:
+        control.check()  # raises SearchAborted once the time or node budget is spent
     if position.moves == Position.WIDTH * Position.HEIGHT:
         return 0  # Draw
 
@@ -238,23 +273,56 @@ def negamax(position, alpha, beta, trans_table):
     if moves == 0:
         return -Position.MAX_SCORE  # No viable moves left, loss inevitable
 
+    # The table stores upper bounds of the score, keyed by the mirror-canonical key
+    key = position.key()
+    upper_bound = trans_table.get(key)
+    if upper_bound is not None:
+        if upper_bound <= alpha:
+            return upper_bound
+        beta = min(beta, upper_bound)
+
     max_eval = float('-inf')
     while moves:
         move = moves & -moves  # Get the lowest bit set
         col = Position.bit_to_col(move)
         if position.can_play(col):
-            new_position = position.clone()
-            new_position.play(col)
-            eval = -negamax(new_position, -beta, -alpha, trans_table)
+            position.play(col)
+            try:
+                eval = -negamax(position, -beta, -alpha, trans_table, control)
+            finally:
+                position.undo()  # also when the search is aborted
             max_eval = max(max_eval, eval)
             alpha = max(alpha, eval)
             if alpha >= beta:
                 break
         moves &= moves - 1  # Remove the lowest bit set
 
+    if max_eval < beta:  # No cutoff, so max_eval is an upper bound of the score
+        trans_table.put(key, max_eval)
     return max_eval
 
 
+def solve_within(position, trans_table, control=None):
+    """
+    Null-window searches narrowing the score range until it closes or control stops them.
+    Returns a SearchResult with the bounds reached and whether the solve finished.
+    """
+    min_score = -((Position.WIDTH * Position.HEIGHT - position.nb_moves()) // 2)
+    max_score = (Position.WIDTH * Position.HEIGHT + 1 - position.nb_moves()) // 2
+    nodes = position.node_count
+    try:
+        while min_score < max_score:
+            med = min_score + (max_score - min_score) // 2
+            r = negamax(position, med, med + 1, trans_table, control)
+            if r <= med:
+                max_score = max(r, min_score)
+            else:
+                min_score = min(r, max_score)
+    except SearchAborted:
+        return SearchResult(min_score, max_score, False, position.node_count - nodes)
+    return SearchResult(min_score, min_score, True, position.node_count - nodes)
+
+
 if __name__ == "__main__":
     # Properly initialize the transposition table with a specified size
     entry_size_bytes = 50
@@ -0,0 +1,201 @@
+import json
+import sys
+import time
+
+from Position import Position
+from Solver import Solver
+
+
+class SearchStats:
+    """
+    Counters collected by an InstrumentedSolver.
+
+    times maps (root ply, ply, phase) to seconds spent at that ply of a search started at root
+    ply, where phase is 'search' (the node's own work), 'tt' (table probes and stores) or
+    'ordering' (move scoring). Those keys are the frames of the flame-style summary.
+    """
+
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.solves = 0
+        self.solve_time = 0.0
+        self.nodes_by_depth = [0] * (width * height + 1)
+        self.tt_probes = 0
+        self.tt_hits = 0
+        self.tt_stores = 0
+        self.tt_overwrites = 0  # stores that evicted the entry of another position
+        self.cutoffs_by_move = [0] * width  # beta cutoffs by index of the move that caused them
+        self.early_cutoffs = 0  # fail-highs before any move was searched (bounds, table or book)
+        self.iterations = []  # (alpha, beta, result) of every null-window search
+        self.times = {}
+
+    def add_time(self, root, ply, phase, seconds):
+        key = (root, ply, phase)
+        self.times[key] = self.times.get(key, 0.0) + seconds
+
+    def to_dict(self):
+        cutoffs = sum(self.cutoffs_by_move)
+        phases = {}
+        for (_, _, phase), seconds in self.times.items():
+            phases[phase] = phases.get(phase, 0.0) + seconds
+        return {
+            'solves': self.solves,
+            'solve_time': self.solve_time,
+            'nodes': sum(self.nodes_by_depth),
+            'nodes_by_depth': {depth: n for depth, n in enumerate(self.nodes_by_depth) if n},
+            'tt_probes': self.tt_probes,
+            'tt_hits': self.tt_hits,
+            'tt_hit_rate': self.tt_hits / self.tt_probes if self.tt_probes else 0.0,
+            'tt_stores': self.tt_stores,
+            'tt_overwrites': self.tt_overwrites,
+            'cutoffs_by_move': self.cutoffs_by_move,
+            'first_move_cutoff_rate': self.cutoffs_by_move[0] / cutoffs if cutoffs else 0.0,
+            'early_cutoffs': self.early_cutoffs,
+            'null_window_iterations': len(self.iterations),
+            'iterations': self.iterations,
+            'phase_times': phases,
+        }
+
+    def to_json(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def folded(self):
+        """
+        Flame-style summary in the folded stack format ("frame;frame;frame microseconds" per line)
+        read by flamegraph.pl and speedscope: one frame per ply below the root, then the phase.
+        """
+        lines = []
+        for (root, ply, phase), seconds in sorted(self.times.items()):
+            stack = ';'.join(['solve'] + [f"ply {p}" for p in range(root, ply + 1)] + [phase])
+            lines.append(f"{stack} {round(seconds * 1e6)}")
+        return lines
+
+    def summary(self):
+        stats = self.to_dict()
+        lines = [f"{stats['nodes']} nodes in {stats['solves']} solves, {stats['solve_time']:.3f} s, "
+                 f"{stats['null_window_iterations']} null-window iterations"]
+        lines.append("nodes by depth: " + ', '.join(f"{d}: {n}" for d, n in stats['nodes_by_depth'].items()))
+        lines.append(f"table: {stats['tt_probes']} probes, {stats['tt_hit_rate']:.1%} hits, "
+                     f"{stats['tt_stores']} stores, {stats['tt_overwrites']} overwrites")
+        lines.append(f"beta cutoffs by move: {stats['cutoffs_by_move']} "
+                     f"({stats['first_move_cutoff_rate']:.1%} on the first move), {stats['early_cutoffs']} early")
+        total = sum(stats['phase_times'].values()) or 1.0
+        lines.append("time by phase: " + ', '.join(f"{phase} {seconds:.3f} s ({seconds / total:.0%})"
+                                                   for phase, seconds in stats['phase_times'].items()))
+        return '\n'.join(lines)
+
+
+class CountingTable:
+    """Wraps a TranspositionTable to count and time probes, hits, stores and overwrites."""
+
+    def __init__(self, table, solver):
+        self.table = table
+        self.solver = solver
+
+    def reset(self):
+        self.table.reset()
+
+    def get(self, key):
+        start_time = time.perf_counter()
+        value = self.table.get(key)
+        self.solver.frames[-1][2] += time.perf_counter() - start_time
+        stats = self.solver.stats
+        stats.tt_probes += 1
+        stats.tt_hits += value != 0
+        return value
+
+    def put(self, key, value):
+        start_time = time.perf_counter()
+        self.solver.stats.tt_overwrites += self.table.occupied_by_other(key)
+        self.solver.stats.tt_stores += 1
+        self.table.put(key, value)
+        self.solver.frames[-1][2] += time.perf_counter() - start_time
+
+
+class InstrumentedSolver(Solver):
+    """
+    Solver that fills a SearchStats while it searches. The counting happens in overrides and
+    wrappers, so the plain Solver does not pay for it.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stats = SearchStats(self.width, self.height)
+        self.trans_table = CountingTable(self.trans_table, self)
+        move_score = self.move_score
+
+        def timed_move_score(P, move):
+            start_time = time.perf_counter()
+            score = move_score(P, move)
+            self.frames[-1][3] += time.perf_counter() - start_time
+            return score
+
+        self.move_score = timed_move_score
+        self.frames = []  # per node being searched: [moves searched, child time, table time, ordering time]
+        self.root = 0
+
+    def reset_stats(self):
+        self.stats = SearchStats(self.width, self.height)
+
+    def negamax(self, P, alpha, beta):
+        frames = self.frames
+        if frames:
+            frames[-1][0] += 1
+        else:
+            self.root = P.nb_moves()
+        frame = [0, 0.0, 0.0, 0.0]
+        frames.append(frame)
+        start_time = time.perf_counter()
+        try:
+            score = super().negamax(P, alpha, beta)
+        finally:
+            elapsed = time.perf_counter() - start_time
+            frames.pop()
+            if frames:
+                frames[-1][1] += elapsed
+
+        stats = self.stats
+        ply = P.nb_moves()
+        stats.nodes_by_depth[ply] += 1
+        if not frames:
+            stats.iterations.append((alpha, beta, score))
+        if score >= beta:
+            if frame[0]:
+                stats.cutoffs_by_move[frame[0] - 1] += 1
+            else:
+                stats.early_cutoffs += 1
+        stats.add_time(self.root, ply, 'search', elapsed - frame[1] - frame[2] - frame[3])
+        stats.add_time(self.root, ply, 'tt', frame[2])
+        stats.add_time(self.root, ply, 'ordering', frame[3])
+        return score
+
+    def solve_bounded(self, P, control=None, weak=False):
+        start_time = time.perf_counter()
+        try:
+            return super().solve_bounded(P, control, weak)
+        finally:
+            self.frames.clear()  # left over when the search was aborted
+            self.stats.solves += 1
+            self.stats.solve_time += time.perf_counter() - start_time
+
+
+def main():
+    # usage: python InstrumentedSolver.py moves [stats.json] [stacks.folded]
+    moves = sys.argv[1]
+    position = Position()
+    if position.play(moves) != len(moves):
+        raise ValueError(f"Invalid move sequence: {moves}")
+    solver = InstrumentedSolver()
+    print(f"{moves} {solver.solve(position)}")
+    print(solver.stats.summary())
+    if len(sys.argv) > 2:
+        solver.stats.to_json(sys.argv[2])
+    if len(sys.argv) > 3:
+        with open(sys.argv[3], 'w') as f:
+            f.write('\n'.join(solver.stats.folded()) + '\n')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""
+Move ordering heuristics for the Solver.
+
+A heuristic is a function (position, move) -> score, higher is searched first. Ties are
+broken by the order moves are added to the MoveSorter, which the Solver does in reverse
+center_first_order, so equal scores come out center column first.
+"""
+
+# Number of set bits of every 16-bit value, popcounts of wider bitboards add up 16-bit chunks
+POPCOUNT16 = bytes(bin(i).count('1') for i in range(1 << 16))
+
+
+def table_popcount(x):
+    count = 0
+    while x:
+        count += POPCOUNT16[x & 0xffff]
+        x >>= 16
+    return count
+
+
+# int.bit_count (Python 3.10+) is a single C call, the table is the fallback on older versions
+popcount = getattr(int, 'bit_count', table_popcount)
+
+
+def center_first_order(width):
+    # Columns ordered from the center outwards, alternating sides: 3, 2, 4, 1, 5, 0, 6 for width 7
+    return [width // 2 + (1 - 2 * (i % 2)) * (i + 1) // 2 for i in range(width)]
+
+
+def threat_score(position, move):
+    # Open threats after playing move: empty cells that would complete four of the player's stones
+    return popcount(position.compute_winning_position(position.current_position | move, position.mask | move))
+
+
+def center_first_score(position, move):
+    # Every move ties, so the moves are searched in plain center-first order
+    return 0
+
+
+ORDERINGS = {
+    'threats': threat_score,
+    'center': center_first_score,
+}
@@ -1,17 +1,34 @@
 class MoveSorter:
+    """
+    Moves of one node sorted by score, in preallocated parallel lists of width entries.
+
+    add() inserts from the back, shifting only the entries with a higher score, so the
+    best move is always last and get_next() pops it in O(1). Among equal scores the move
+    added last comes out first. The Solver keeps one sorter per depth and reuses it.
+    """
+
     def __init__(self, width):
-        self.entries = []
-        self.width = width  # This will replace Position::WIDTH
+        self.width = width
+        self.moves = [0] * width
+        self.scores = [0] * width
+        self.size = 0
 
     def add(self, move, score):
-        # Insertion sort to maintain order as in the original C++ code
-        from bisect import insort_left
-        insort_left(self.entries, (score, move), key=lambda x: -x[0])
+        moves, scores = self.moves, self.scores
+        pos = self.size
+        self.size += 1
+        while pos and scores[pos - 1] > score:
+            moves[pos] = moves[pos - 1]
+            scores[pos] = scores[pos - 1]
+            pos -= 1
+        moves[pos] = move
+        scores[pos] = score
 
     def get_next(self):
-        if self.entries:
-            return self.entries.pop(0)[1]
+        if self.size:
+            self.size -= 1
+            return self.moves[self.size]
         return 0
 
     def reset(self):
-        self.entries = []
+        self.size = 0
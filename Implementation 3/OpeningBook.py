@@ -0,0 +1,126 @@
+import mmap
+import struct
+import sys
+import time
+from array import array
+from bisect import bisect_left
+
+import numpy as np
+
+from Position import Position
+from PositionBatch import PositionBatch
+from Solver import Solver
+
+# File layout: a 16-byte header (magic, width, height, depth, weak) followed by sorted uint64 entries,
+# each packing (key << 8) | (score & 0xff). Sorting the packed entries sorts them by key.
+MAGIC = b'C4BK'
+HEADER = struct.Struct('<4sBBBB8x')
+
+
+class Book:
+    """
+    Opening book of exact scores, looked up by binary search in a memory-mapped file.
+
+    Only the pages touched by the searches are read, so opening a large book is instant and
+    does not load it into memory. Keys are Position.key(), so mirrored positions share an entry.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.mmap = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.width, self.height, self.depth, weak = HEADER.unpack_from(self.mmap)
+        self.weak = bool(weak)  # scores are only -1, 0 or 1
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an opening book")
+        if (self.width, self.height) != (Position.WIDTH, Position.HEIGHT):
+            raise ValueError(f"{path} is a book for {self.width}x{self.height} boards")
+        self.entries = memoryview(self.mmap)[HEADER.size:].cast('Q')
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, position):
+        # Exact score of the position for the player to move, None if it is not in the book
+        if position.nb_moves() > self.depth:
+            return None
+        key = position.key()
+        i = bisect_left(self.entries, key << 8)
+        if i < len(self.entries) and self.entries[i] >> 8 == key:
+            score = self.entries[i] & 0xff
+            return score - 256 if score >= 128 else score
+        return None
+
+    def get_sequence(self, moves):
+        # Score of the position reached by a string of 1-based columns
+        position = Position()
+        if position.play(moves) != len(moves):
+            return None
+        return self.get(position)
+
+    def close(self):
+        self.entries.release()
+        self.mmap.close()
+        self.file.close()
+
+
+def enumerate_positions(depth, moves=""):
+    """
+    All positions reachable from moves in at most depth further moves, without a win on the way,
+    one per mirror pair. Returns a PositionBatch ordered by number of moves.
+    """
+    level = PositionBatch.from_sequences([moves])
+    levels = [level]
+    for _ in range(depth):
+        children = []
+        for col in range(PositionBatch.WIDTH):
+            playable = level.can_play(np.full(len(level), col)) & ~level.is_winning_move(np.full(len(level), col))
+            child = level[playable].copy()
+            child.play_col(np.full(len(child), col))
+            children.append(child)
+        level = PositionBatch(current_position=np.concatenate([c.current_position for c in children]),
+                              mask=np.concatenate([c.mask for c in children]),
+                              moves=np.concatenate([c.moves for c in children]))
+        _, unique = np.unique(level.key(), return_index=True)
+        level = level[np.sort(unique)]
+        levels.append(level)
+    return PositionBatch(current_position=np.concatenate([l.current_position for l in levels]),
+                         mask=np.concatenate([l.mask for l in levels]),
+                         moves=np.concatenate([l.moves for l in levels]))
+
+
+def generate_book(path, depth, moves="", solver=None, weak=False):
+    """
+    Solve every position up to depth moves after moves (the empty board by default) and write
+    them to path as a book. Deeper positions are solved first so that their transposition table
+    entries speed up the shallower ones.
+    """
+    solver = Solver() if solver is None else solver
+    positions = enumerate_positions(depth, moves)
+    keys = positions.key()
+    scores = np.zeros(len(positions), dtype=np.int64)
+
+    start_time = time.time()
+    for n, i in enumerate(np.argsort(-positions.moves, kind='stable')):
+        position = positions.position(i)
+        scores[i] = solver.solve(position, weak)
+        if (n + 1) % 1000 == 0:
+            print(f"{n + 1}/{len(positions)} positions solved in {time.time() - start_time:.1f} s")
+
+    entries = np.sort((keys << np.uint64(8)) | (scores.astype(np.uint64) & np.uint64(0xff)))
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, Position.WIDTH, Position.HEIGHT, len(moves) + depth, weak))
+        array('Q', entries.tolist()).tofile(f)
+    print(f"Wrote {len(entries)} positions to {path} in {time.time() - start_time:.1f} s")
+    return len(entries)
+
+
+def main():
+    # usage: python OpeningBook.py depth output [moves] [-w]
+    args = [arg for arg in sys.argv[1:] if arg != '-w']
+    depth, path = int(args[0]), args[1]
+    moves = args[2] if len(args) > 2 else ""
+    generate_book(path, depth, moves, weak='-w' in sys.argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # for the shared SearchControl
+
+from Position import Position
+from SearchControl import SearchControl
+from SharedTranspositionTable import SharedTranspositionTable
+from Solver import Solver
+
+_solver = None  # per worker process, kept between requests so its table stays warm
+_shared = {}  # shared tables and stop flags attached by this worker, by name
+
+
+def _init_worker(own_table):
+    global _solver
+    if own_table:  # lazy-SMP workers only use the shared table
+        _solver = Solver()
+
+
+def _position(moves):
+    position = Position()
+    if position.play(moves) != len(moves):
+        raise ValueError(f"Invalid move sequence: {moves}")
+    return position
+
+
+def _solve(moves, weak):
+    # Exact (or weak) score of the position after moves, with this worker's own table
+    nodes = _solver.node_count
+    score = _solver.solve(_position(moves), weak)
+    return score, _solver.node_count - nodes
+
+
+def _probe(moves, med):
+    # One null-window search: the result is <= med if the score is <= med, else > med
+    nodes = _solver.node_count
+    score = _solver.negamax(_position(moves), med, med + 1)
+    return score, _solver.node_count - nodes
+
+
+class SharedStopControl(SearchControl):
+    """SearchControl whose cancel flag is a byte of shared memory, set by the parent process."""
+
+    def __init__(self, flag):
+        self.flag = flag
+        super().__init__()
+
+    @property
+    def cancelled(self):
+        return self.flag[0] != 0
+
+    @cancelled.setter
+    def cancelled(self, value):
+        if value:  # SearchControl.__init__ clears the flag, which must not stop the other workers
+            self.flag[0] = 1
+
+
+def _attach(table_name, flag_name):
+    if table_name not in _shared:
+        _shared[table_name] = SharedTranspositionTable.attach(table_name)
+    if flag_name not in _shared:
+        _shared[flag_name] = shared_memory.SharedMemory(name=flag_name)
+    return _shared[table_name], _shared[flag_name]
+
+
+def _lazy_solve(moves, weak, table_name, flag_name, worker):
+    """
+    Lazy-SMP worker: a full solve of the position on the shared table. Workers only differ in
+    the order they try columns with equal move scores, so they spread over the tree and reuse
+    each other's table entries. The search stops when the stop flag is set.
+    """
+    table, flag = _attach(table_name, flag_name)
+    solver = Solver(trans_table=table)
+    shift = worker % solver.width
+    solver.column_masks = solver.column_masks[shift:] + solver.column_masks[:shift]
+    result = solver.solve_bounded(_position(moves), SharedStopControl(flag.buf), weak)
+    return result.score if result.finished else None, solver.node_count
+
+
+class ParallelSolver:
+    """
+    Solves one position on several processes.
+
+    mode 'root' solves every column of the root in parallel, each worker with its own table.
+    mode 'probes' runs several null-window searches with different test scores at once, so each
+    round narrows the score range into workers + 1 parts instead of two.
+    mode 'lazy' runs a full solve in every worker on a transposition table in shared memory
+    and takes the first worker to finish.
+    """
+
+    def __init__(self, workers=None, mode='lazy', log_size=22):
+        self.workers = workers or os.cpu_count()
+        self.mode = mode
+        self.node_count = 0
+        self.last_time = 0.0
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                            initargs=(mode != 'lazy',))
+        self.table = None
+        self.flag = None
+        if mode == 'lazy':
+            self.table = SharedTranspositionTable(Position.WIDTH * (Position.HEIGHT + 1), 8, log_size)
+            self.flag = shared_memory.SharedMemory(create=True, size=1)
+
+    def solve(self, moves, weak=False):
+        """Score of the position after moves (a string of 1-based columns) for the player to move."""
+        start_time = time.time()
+        position = _position(moves)
+        if position.can_win_next():
+            score = 1 if weak else (Position.WIDTH * Position.HEIGHT + 1 - position.nb_moves()) // 2
+        elif self.mode == 'root':
+            score = self.solve_root(position, moves, weak)
+        elif self.mode == 'probes':
+            score = self.solve_probes(position, moves, weak)
+        else:
+            score = self.solve_lazy(moves, weak)
+        self.last_time = time.time() - start_time
+        return score
+
+    def solve_root(self, position, moves, weak):
+        futures = [self.executor.submit(_solve, moves + str(col + 1), weak)
+                   for col in range(Position.WIDTH) if position.can_play(col)]
+        best = None
+        for future in futures:
+            score, nodes = future.result()
+            self.node_count += nodes
+            best = -score if best is None else max(best, -score)
+        return best
+
+    def solve_probes(self, position, moves, weak):
+        min_score = -((Position.WIDTH * Position.HEIGHT - position.nb_moves()) // 2)
+        max_score = (Position.WIDTH * Position.HEIGHT + 1 - position.nb_moves()) // 2
+        if weak:
+            min_score, max_score = -1, 1
+        while min_score < max_score:
+            # up to one test score per worker, spread evenly over [min_score, max_score)
+            span = max_score - min_score
+            meds = sorted({min_score + span * (i + 1) // (self.workers + 1) for i in range(self.workers)})
+            futures = {med: self.executor.submit(_probe, moves, med) for med in meds}
+            for med, future in futures.items():
+                r, nodes = future.result()
+                self.node_count += nodes
+                if r <= med:
+                    max_score = min(max_score, max(r, min_score))
+                else:
+                    min_score = max(min_score, min(r, max_score))
+        return min_score
+
+    def solve_lazy(self, moves, weak):
+        self.flag.buf[0] = 0
+        futures = [self.executor.submit(_lazy_solve, moves, weak, self.table.name, self.flag.name, worker)
+                   for worker in range(self.workers)]
+        score = None
+        pending = set(futures)
+        while score is None and pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                result, _ = future.result()
+                if result is not None:
+                    score = result
+        self.flag.buf[0] = 1  # stop the workers that are still searching
+        for future in futures:
+            self.node_count += future.result()[1]
+        return score
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
+        if self.table is not None:
+            self.table.close()
+            self.flag.close()
+            self.flag.unlink()
@@ -1,32 +1,65 @@
+from functools import lru_cache
+
 import numpy as np
 
+from MoveOrdering import threat_score
+
+
+def geometry(width, height):
+    """
+    Class attributes of Position for a width x height board: score bounds and bitboard masks,
+    with one column every height + 1 bits.
+    """
+    stride = height + 1
+    bottom_masks = tuple(1 << (col * stride) for col in range(width))
+    bottom_mask = sum(bottom_masks)
+    return {
+        'WIDTH': width,
+        'HEIGHT': height,
+        'MIN_SCORE': -((width * height) // 2) + 3,
+        'MAX_SCORE': (width * height + 1) // 2 - 3,
+        'bottom_mask': bottom_mask,
+        'board_mask': bottom_mask * ((1 << height) - 1),
+        'bottom_masks': bottom_masks,
+        'top_masks': tuple(1 << (height - 1 + col * stride) for col in range(width)),
+        'column_masks': tuple(((1 << height) - 1) << (col * stride) for col in range(width)),
+        'mirror_shifts': tuple((width - 1 - 2 * col) * stride for col in range(width)),
+    }
+
 
 class Position:
+    # The standard 7x6 board, position_class() makes subclasses for other sizes
     WIDTH = 7
     HEIGHT = 6
-    MIN_SCORE = -(WIDTH * HEIGHT) // 2 + 3
-    MAX_SCORE = (WIDTH * HEIGHT + 1) // 2 - 3
-
-    bottom_mask = sum(1 << (7 * i) for i in range(7))
-    board_mask = (1 << 6) - 1
 
     def __init__(self):
         self.current_position = 0
         self.mask = 0
+        self.mirror_position = 0  # current_position and mask of the left-right mirror image
+        self.mirror_mask = 0
         self.moves = 0
+        self.history = []  # undo stack of the bitboards before each move
 
     def play(self, move):
         if isinstance(move, int):  # Handling bitboard move directly
+            self.history.append((self.current_position, self.mask, self.mirror_position, self.mirror_mask))
             self.current_position ^= self.mask
             self.mask |= move
+            self.mirror_position ^= self.mirror_mask
+            self.mirror_mask |= self.mirror_move(move)
             self.moves += 1
         elif isinstance(move, str):  # Handling string sequence of moves
             return self.play_sequence(move)
 
+    def undo(self):
+        # take back the last move played
+        self.current_position, self.mask, self.mirror_position, self.mirror_mask = self.history.pop()
+        self.moves -= 1
+
     def play_sequence(self, moves):
         for i, char in enumerate(moves):
-            col = int(char) - 1
-            if not self.can_play(col):
+            col = int(char) - 1 if char.isdigit() else -1
+            if not 0 <= col < self.WIDTH or not self.can_play(col):
                 return i
             if self.is_winning_move(col):
                 return i
@@ -34,41 +67,54 @@ class Position:
         return len(moves)
 
     def can_play(self, col):
-        top_cell = 1 << ((self.HEIGHT - 1) + col * (self.HEIGHT + 1))
-        return (self.mask & top_cell) == 0
+        return (self.mask & self.top_masks[col]) == 0
 
     def playCol(self, col):
-        move = (self.mask + self.bottom_mask_col(col)) & self.column_mask(col)
+        move = (self.mask + self.bottom_masks[col]) & self.column_masks[col]
         self.play(move)
 
     def is_winning_move(self, col):
-        move = (self.mask + self.bottom_mask_col(col)) & self.column_mask(col)
+        move = (self.mask + self.bottom_masks[col]) & self.column_masks[col]
         return bool(self.winning_position() & move)
 
     def can_win_next(self):
-        #if any of the winning positions is a subset of the current position, then the current player can win in the next move
-        return bool(self.winning_position() & self.current_position)
+        #if any of the playable cells completes an alignment, then the current player can win in the next move
+        return bool(self.winning_position() & self.possible())
 
     def winning_position(self):
         return self.compute_winning_position(self.current_position, self.mask)
 
     def compute_winning_position(self, position, mask):
-        vertical = (position << 1) & (position << 2) & (position << 3)
-        horizontal = (position << (self.HEIGHT + 1)) & (position << 2 * (self.HEIGHT + 1)) & (position << 3 * (self.HEIGHT + 1))
-        diag1 = (position << self.HEIGHT) & (position << 2 * self.HEIGHT) & (position << 3 * self.HEIGHT)
-        diag2 = (position << (self.HEIGHT + 2)) & (position << 2 * (self.HEIGHT + 2)) & (position << 3 * (self.HEIGHT + 2))
-        return vertical | horizontal | diag1 | diag2
-
-    @staticmethod
-    def bottom_mask_col(col):
-        return 1 << (col * (Position.HEIGHT + 1))
-
-    @staticmethod
-    def column_mask(col):
-        return ((1 << Position.HEIGHT) - 1) << (col * (Position.HEIGHT + 1))
+        # vertical: only three stones below can complete a column
+        r = (position << 1) & (position << 2) & (position << 3)
+
+        # horizontal and both diagonals: the empty cell can be at either end or in the middle of the four
+        for shift in (self.HEIGHT + 1, self.HEIGHT, self.HEIGHT + 2):
+            p = (position << shift) & (position << 2 * shift)
+            r |= p & (position << 3 * shift)
+            r |= p & (position >> shift)
+            p = (position >> shift) & (position >> 2 * shift)
+            r |= p & (position << shift)
+            r |= p & (position >> 3 * shift)
+
+        return r & (self.board_mask ^ mask)
+
+    @classmethod
+    def mirror_move(cls, move):
+        # move the single bit of a played cell to the same row of the mirrored column
+        shift = cls.mirror_shifts[(move.bit_length() - 1) // (cls.HEIGHT + 1)]
+        return move << shift if shift >= 0 else move >> -shift
+
+    @classmethod
+    def bottom_mask_col(cls, col):
+        return cls.bottom_masks[col]
+
+    @classmethod
+    def column_mask(cls, col):
+        return cls.column_masks[col]
 
     def possible(self):
-        return (self.mask + Position.bottom_mask) & Position.board_mask
+        return (self.mask + self.bottom_mask) & self.board_mask
 
     def opponent_winning_position(self):
         opponent_position = self.mask & ~self.current_position
@@ -88,8 +134,42 @@ class Position:
         return board
 
     def possible_non_losing_moves(self):
-        return self.possible() & ~(self.opponent_winning_position())
+        possible_mask = self.possible()
+        opponent_win = self.opponent_winning_position()
+        forced_moves = possible_mask & opponent_win
+        if forced_moves:
+            if forced_moves & (forced_moves - 1):  # opponent has two winning moves, we cannot block both
+                return 0
+            possible_mask = forced_moves  # we have to block the only winning move of the opponent
+        return possible_mask & ~(opponent_win >> 1)  # avoid playing below an opponent winning cell
+
+    def move_score(self, move):
+        # number of winning cells the current player would have after playing move
+        return threat_score(self, move)
+
+    def clone(self):
+        # Without the undo history: the clone cannot undo past this position, but cloning stays O(1)
+        new_position = type(self)()
+        new_position.current_position = self.current_position
+        new_position.mask = self.mask
+        new_position.mirror_position = self.mirror_position
+        new_position.mirror_mask = self.mirror_mask
+        new_position.moves = self.moves
+        return new_position
 
     def key(self):
-        #add mask to the key to differentiate between positions with the same current_position
-        return self.current_position + self.mask
\ No newline at end of file
+        # current_position + mask is unique (each column adds up to 2^k - 1 plus the current player's stones,
+        # below the HEIGHT + 1 bit stride); the smaller of the key and the mirror image's key is shared by both positions
+        return min(self.current_position + self.mask, self.mirror_position + self.mirror_mask)
+
+
+for _name, _value in geometry(Position.WIDTH, Position.HEIGHT).items():
+    setattr(Position, _name, _value)
+
+
+@lru_cache(maxsize=None)
+def position_class(width, height):
+    """Position class for a width x height board, its masks are computed once per size."""
+    if (width, height) == (Position.WIDTH, Position.HEIGHT):
+        return Position
+    return type(f"Position{width}x{height}", (Position,), geometry(width, height))
@@ -0,0 +1,198 @@
+import numpy as np
+
+from Position import Position
+
+
+def _u64(value):
+    return np.uint64(value)
+
+
+class PositionBatch:
+    """
+    N Connect 4 positions stored as parallel NumPy uint64 bitboards.
+
+    Uses the same encoding as Position (current_position holds the stones of the player to move,
+    mask all stones, one column every HEIGHT + 1 bits) and offers the same bitboard operations,
+    evaluated for every board of the batch in one call.
+    """
+    WIDTH = Position.WIDTH
+    HEIGHT = Position.HEIGHT
+
+    bottom_mask = _u64(Position.bottom_mask)
+    board_mask = _u64(Position.board_mask)
+
+    def __init__(self, size=0, current_position=None, mask=None, moves=None):
+        self.current_position = np.zeros(size, dtype=np.uint64) if current_position is None else current_position
+        self.mask = np.zeros(size, dtype=np.uint64) if mask is None else mask
+        self.moves = np.zeros(len(self.mask), dtype=np.int8) if moves is None else moves
+
+    @classmethod
+    def from_positions(cls, positions):
+        return cls(current_position=np.array([p.current_position for p in positions], dtype=np.uint64),
+                   mask=np.array([p.mask for p in positions], dtype=np.uint64),
+                   moves=np.array([p.nb_moves() for p in positions], dtype=np.int8))
+
+    @classmethod
+    def from_sequences(cls, sequences):
+        positions = []
+        for moves in sequences:
+            position = Position()
+            if position.play(moves) != len(moves):
+                raise ValueError(f"Invalid move sequence: {moves}")
+            positions.append(position)
+        return cls.from_positions(positions)
+
+    def position(self, i):
+        # Scalar Position for board i (without move history, so it cannot be undone)
+        position = Position()
+        position.current_position = int(self.current_position[i])
+        position.mask = int(self.mask[i])
+        position.moves = int(self.moves[i])
+        position.mirror_position = int(self.mirror(self.current_position[i:i + 1])[0])
+        position.mirror_mask = int(self.mirror(self.mask[i:i + 1])[0])
+        return position
+
+    def __len__(self):
+        return len(self.mask)
+
+    def __getitem__(self, index):
+        return PositionBatch(current_position=self.current_position[index], mask=self.mask[index],
+                             moves=self.moves[index])
+
+    def copy(self):
+        return PositionBatch(current_position=self.current_position.copy(), mask=self.mask.copy(),
+                             moves=self.moves.copy())
+
+    @staticmethod
+    def column_shift(cols):
+        return np.asarray(cols, dtype=np.uint64) * _u64(PositionBatch.HEIGHT + 1)
+
+    @staticmethod
+    def top_mask_col(cols):
+        return _u64(1 << (PositionBatch.HEIGHT - 1)) << PositionBatch.column_shift(cols)
+
+    @staticmethod
+    def bottom_mask_col(cols):
+        return _u64(1) << PositionBatch.column_shift(cols)
+
+    @staticmethod
+    def column_mask(cols):
+        return _u64((1 << PositionBatch.HEIGHT) - 1) << PositionBatch.column_shift(cols)
+
+    def can_play(self, cols):
+        return (self.mask & self.top_mask_col(cols)) == 0
+
+    def play(self, move, active=None):
+        # move is a uint64 array with the bit of the played cell for each board; boards where
+        # active is False (or move is 0) are left unchanged
+        if active is None:
+            active = move != 0
+        self.current_position = np.where(active, self.current_position ^ self.mask, self.current_position)
+        self.mask = np.where(active, self.mask | move, self.mask)
+        self.moves = self.moves + active.astype(np.int8)
+
+    def play_col(self, cols, active=None):
+        cols = np.asarray(cols)
+        move = (self.mask + self.bottom_mask_col(cols)) & self.column_mask(cols)
+        legal = self.can_play(cols)
+        self.play(move, legal if active is None else legal & active)
+        return legal
+
+    def is_winning_move(self, cols):
+        move = (self.mask + self.bottom_mask_col(cols)) & self.column_mask(cols)
+        return (self.winning_position() & move) != 0
+
+    def can_win_next(self):
+        return (self.winning_position() & self.possible()) != 0
+
+    def winning_position(self):
+        return self.compute_winning_position(self.current_position, self.mask)
+
+    def opponent_winning_position(self):
+        return self.compute_winning_position(self.current_position ^ self.mask, self.mask)
+
+    @staticmethod
+    def compute_winning_position(position, mask):
+        # vertical: only three stones below can complete a column
+        r = (position << _u64(1)) & (position << _u64(2)) & (position << _u64(3))
+
+        # horizontal and both diagonals: the empty cell can be at either end or in the middle of the four
+        for shift in (PositionBatch.HEIGHT + 1, PositionBatch.HEIGHT, PositionBatch.HEIGHT + 2):
+            s1, s2, s3 = _u64(shift), _u64(2 * shift), _u64(3 * shift)
+            p = (position << s1) & (position << s2)
+            r |= p & (position << s3)
+            r |= p & (position >> s1)
+            p = (position >> s1) & (position >> s2)
+            r |= p & (position << s1)
+            r |= p & (position >> s3)
+
+        return r & (PositionBatch.board_mask ^ mask)
+
+    def possible(self):
+        return (self.mask + PositionBatch.bottom_mask) & PositionBatch.board_mask
+
+    def possible_non_losing_moves(self):
+        possible_mask = self.possible()
+        opponent_win = self.opponent_winning_position()
+        forced_moves = possible_mask & opponent_win
+        # a single forced move must be played, two or more cannot all be blocked
+        single = (forced_moves & (forced_moves - _u64(1))) == 0
+        possible_mask = np.where(forced_moves != 0, np.where(single, forced_moves, _u64(0)), possible_mask)
+        return possible_mask & ~(opponent_win >> _u64(1))
+
+    def nb_moves(self):
+        return self.moves
+
+    @staticmethod
+    def mirror(bitboard):
+        # swap columns left to right
+        column = _u64((1 << (PositionBatch.HEIGHT + 1)) - 1)
+        mirrored = np.zeros_like(bitboard)
+        for col in range(PositionBatch.WIDTH):
+            shift = _u64(col * (PositionBatch.HEIGHT + 1))
+            mirrored_shift = _u64((PositionBatch.WIDTH - 1 - col) * (PositionBatch.HEIGHT + 1))
+            mirrored |= ((bitboard >> shift) & column) << mirrored_shift
+        return mirrored
+
+    def key(self):
+        # same mirror-canonical key as Position.key()
+        return np.minimum(self.current_position + self.mask,
+                          self.mirror(self.current_position) + self.mirror(self.mask))
+
+
+def random_positions(num_positions, move_count, rng=None):
+    """
+    Random non-terminal positions with move_count moves, grown in lockstep as a batch.
+
+    Each step plays a uniformly random column on every unfinished board. Like
+    simulator.generate_position, a board is restarted from scratch when the column is full,
+    the move wins, or the player to move could then win immediately.
+    Returns the batch and the move string of each board.
+    """
+    rng = np.random.default_rng() if rng is None else rng
+    batch = PositionBatch(num_positions)
+    if move_count == 0:  # the empty boards are already done
+        return batch, [''] * num_positions
+    history = np.zeros((num_positions, move_count), dtype=np.int8)
+
+    # only the unfinished boards are advanced, so the stragglers do not pay for the whole batch
+    index = np.arange(num_positions)
+    while len(index):
+        boards = batch[index]
+        cols = rng.integers(0, PositionBatch.WIDTH, size=len(index))
+        history[index, boards.moves] = cols
+
+        failed = ~boards.can_play(cols) | boards.is_winning_move(cols)
+        boards.play_col(cols, ~failed)
+        failed |= boards.can_win_next()
+
+        boards.current_position[failed] = 0
+        boards.mask[failed] = 0
+        boards.moves[failed] = 0
+        batch.current_position[index] = boards.current_position
+        batch.mask[index] = boards.mask
+        batch.moves[index] = boards.moves
+        index = index[boards.moves < move_count]
+
+    sequences = [''.join(str(col + 1) for col in row) for row in history]
+    return batch, sequences
@@ -0,0 +1,189 @@
+import random
+import struct
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+from TranspositionTable import next_prime
+
+# Block layout: a 16-byte header (magic, key_size, value_size, log_size) followed by size slots
+# of two 64-bit words, (partial key XOR data, data)
+MAGIC = b'C4TT'
+HEADER = struct.Struct('<4sBBB9x')
+
+
+class SharedTranspositionTable:
+    """
+    Transposition table in a multiprocessing.shared_memory block that any number of processes
+    create or attach to by name and read and write concurrently.
+
+    Like TranspositionTable it has a prime number of slots and stores only the partial key
+    (key_size - log_size low bits), but each slot is two words: the data and the data XORed with
+    the partial key. Updates take no lock. A reader that sees a slot half written by another
+    process finds that the two words no longer XOR to its key and treats the slot as empty, so
+    a race can lose an entry but never return another position's value.
+    """
+
+    def __init__(self, key_size, value_size, log_size, name=None):
+        # name=None creates a new block, else the block of that name is attached
+        self.owner = name is None
+        if self.owner:
+            self.size = next_prime(1 << log_size)
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER.size + 16 * self.size)
+            HEADER.pack_into(self.shm.buf, 0, MAGIC, key_size, value_size, log_size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+            magic, stored_key_size, stored_value_size, stored_log_size = HEADER.unpack_from(self.shm.buf)
+            if magic != MAGIC:
+                raise ValueError(f"{name} is not a shared transposition table")
+            if (stored_key_size, stored_value_size, stored_log_size) != (key_size, value_size, log_size):
+                raise ValueError(f"{name} has key_size {stored_key_size}, value_size {stored_value_size}, "
+                                 f"log_size {stored_log_size}")
+            self.size = next_prime(1 << log_size)
+        self.key_size = key_size
+        self.value_size = value_size
+        self.log_size = log_size
+        self.key_mask = (1 << max(key_size - log_size, 0)) - 1
+        self.value_mask = (1 << value_size) - 1
+        if self.key_mask.bit_length() > 64 or value_size > 64:
+            raise ValueError("Partial key or value does not fit in a 64-bit word")
+        self.entries = self.shm.buf[HEADER.size:HEADER.size + 16 * self.size].cast('Q')
+        if self.owner:
+            self.reset()
+
+    @classmethod
+    def attach(cls, name):
+        # Attach to an existing table, reading its geometry from the block header
+        shm = shared_memory.SharedMemory(name=name)
+        magic, key_size, value_size, log_size = HEADER.unpack_from(shm.buf)
+        shm.close()
+        if magic != MAGIC:
+            raise ValueError(f"{name} is not a shared transposition table")
+        return cls(key_size, value_size, log_size, name)
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def reset(self):
+        self.shm.buf[HEADER.size:HEADER.size + 16 * self.size] = bytes(16 * self.size)
+
+    def put(self, key, value):
+        # A value of 0 is used to encode missing data
+        slot = 2 * (key % self.size)
+        self.entries[slot + 1] = value
+        self.entries[slot] = (key & self.key_mask) ^ value
+
+    def get(self, key):
+        slot = 2 * (key % self.size)
+        check, value = self.entries[slot], self.entries[slot + 1]
+        if check ^ value == key & self.key_mask:
+            return value & self.value_mask
+        return 0
+
+    def occupied_by_other(self, key):
+        # True if a put of key would overwrite another key's entry
+        slot = 2 * (key % self.size)
+        check, value = self.entries[slot], self.entries[slot + 1]
+        return value != 0 and check ^ value != key & self.key_mask
+
+    def detach(self):
+        # Stop using the table in this process, the block stays for the others
+        self.entries.release()
+        self.shm.close()
+
+    def close(self):
+        # Detach, and free the block if this process created it
+        self.detach()
+        if self.owner:
+            self.shm.unlink()
+
+
+def _hammer(name, seed, operations, num_keys):
+    """
+    Random puts and gets from one process on keys whose value is a function of the key.
+    Returns (hits, wrong values) so the caller can check that no read returned corrupted data.
+    """
+    table = SharedTranspositionTable.attach(name)
+    rng = random.Random(seed)
+    keys = random.Random(0).sample(range(1 << table.key_size), num_keys)  # the same keys in every process
+    hits = wrong = 0
+    try:
+        for _ in range(operations):
+            key = keys[rng.randrange(num_keys)]
+            expected = key % table.value_mask + 1  # never 0
+            if rng.random() < 0.5:
+                table.put(key, expected)
+            else:
+                value = table.get(key)
+                hits += value != 0
+                wrong += value not in (0, expected)
+    finally:
+        table.detach()
+    return hits, wrong
+
+
+def _solve_shared(name, positions):
+    # Solve (moves, expected score) positions on the shared table, returns the number of wrong scores
+    from Position import Position
+    from Solver import Solver
+    table = SharedTranspositionTable.attach(name)
+    solver = Solver(trans_table=table)
+    wrong = 0
+    try:
+        for moves, expected in positions:
+            position = Position()
+            position.play(moves)
+            wrong += solver.solve(position) != expected
+    finally:
+        table.detach()
+    return wrong
+
+
+def solver_stress_test(processes=4, test_set='middle_easy', log_size=12):
+    """
+    Several Solver processes solve the same test set positions, in different orders, on one
+    small shared table, so they keep overwriting each other's entries. Every score must be exact.
+    """
+    from benchmark_suite import load_test_set
+    positions = load_test_set(test_set)
+    table = SharedTranspositionTable(49, 8, log_size)
+    start_time = time.time()
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_solve_shared, table.name, positions[i:] + positions[:i])
+                       for i in range(processes)]
+            wrong = sum(future.result() for future in futures)
+    finally:
+        table.close()
+    print(f"{processes} solver processes, {processes * len(positions)} solves in {time.time() - start_time:.1f} s: "
+          f"{wrong} wrong scores")
+    return wrong == 0
+
+
+def stress_test(processes=4, operations=200000, num_keys=5000, log_size=10):
+    """
+    Several processes hammer a small table (many keys per slot) at the same time. Every hit must
+    return the value that belongs to its key.
+    """
+    table = SharedTranspositionTable(49, 8, log_size)
+    start_time = time.time()
+    try:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = [executor.submit(_hammer, table.name, seed, operations, num_keys) for seed in range(processes)]
+            results = [future.result() for future in futures]
+    finally:
+        table.close()
+    hits = sum(hits for hits, _ in results)
+    wrong = sum(wrong for _, wrong in results)
+    print(f"{processes} processes, {processes * operations} operations in {time.time() - start_time:.1f} s: "
+          f"{hits} hits, {wrong} wrong values")
+    return wrong == 0
+
+
+if __name__ == "__main__":
+    # usage: python SharedTranspositionTable.py [processes]
+    num_processes = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    if not (stress_test(num_processes) and solver_stress_test(num_processes)):
+        sys.exit(1)
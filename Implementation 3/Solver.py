@@ -1,18 +1,46 @@
 import copy
 import math
+import os
+import sys
 import time
-from Position import Position
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # for the shared SearchControl
+
+from Position import position_class
+from MoveOrdering import center_first_order, threat_score
 from MoveSorter import MoveSorter
+from SearchControl import SearchAborted, SearchResult
 from TranspositionTable import TranspositionTable
 
+def default_log_size(width, height):
+    # 2**22 slots (32 MB) for 7x6 and larger boards, smaller boards need far fewer
+    return min(22, max(12, width * height // 2 + 1))
+
+
 class Solver:
-    def __init__(self, width=7, height=6):
+    def __init__(self, width=7, height=6, trans_table=None, book=None, move_score=threat_score):
         self.width = width
         self.height = height
+        self.position_class = position_class(width, height)  # Position for this board size
+        self.cells = width * height
+        self.MIN_SCORE = self.position_class.MIN_SCORE
+        self.MAX_SCORE = self.position_class.MAX_SCORE
         self.node_count = 0
-        self.trans_table = TranspositionTable(key_size=64, value_size=64, log_size=22)  # Adjust these values based on your actual configuration
+        if book is not None and (book.width, book.height) != (width, height):
+            raise ValueError(f"Opening book is for {book.width}x{book.height} boards")
+        self.book = book  # optional OpeningBook.Book with exact scores of early positions
+        self.control = None  # SearchControl of the running solve_bounded, checked at every node
+        if trans_table is None:
+            # keys use width * (height + 1) bits, values fit in 8 bits (see the bound encoding in negamax)
+            trans_table = TranspositionTable(key_size=width * (height + 1), value_size=8,
+                                             log_size=default_log_size(width, height))
+        self.trans_table = trans_table
         # Initialize column order as in C++, centered and alternating
-        self.column_order = [width // 2 + (1 - 2 * (i % 2)) * (i + 1) // 2 for i in range(width)]
+        self.column_order = center_first_order(width)
+        self.column_masks = [self.position_class.column_masks[col] for col in self.column_order]
+        self.move_score = move_score  # (position, move) -> score, see MoveOrdering
+        # one reusable sorter per number of moves played, so no node allocates its own
+        self.sorters = [MoveSorter(width) for _ in range(width * height + 1)]
 
     def reset(self):
         self.trans_table.reset()
@@ -23,21 +51,23 @@ class Solver:
         assert not P.can_win_next()
 
         self.node_count += 1
+        if self.control is not None:
+            self.control.check()
 
         possible = P.possible_non_losing_moves()
         if possible == 0:
-            return -(Position.WIDTH * Position.HEIGHT - P.nb_moves()) // 2
+            return -((self.cells - P.nb_moves()) // 2)
 
-        if P.nb_moves() >= Position.WIDTH * Position.HEIGHT - 2:
+        if P.nb_moves() >= self.cells - 2:
             return 0
 
-        min_score = -(Position.WIDTH * Position.HEIGHT - 2 - P.nb_moves()) // 2
+        min_score = -((self.cells - 2 - P.nb_moves()) // 2)
         if alpha < min_score:
             alpha = min_score
             if alpha >= beta:
                 return alpha
 
-        max_score = (Position.WIDTH * Position.HEIGHT - 1 - P.nb_moves()) // 2
+        max_score = (self.cells - 1 - P.nb_moves()) // 2
         if beta > max_score:
             beta = max_score
             if alpha >= beta:
@@ -46,61 +76,94 @@ class Solver:
         key = P.key()
         val = self.trans_table.get(key)
         if val:
-            if val > Position.MAX_SCORE - Position.MIN_SCORE + 1:
-                min_score = val + 2 * Position.MIN_SCORE - Position.MAX_SCORE - 2
+            if val > self.MAX_SCORE - self.MIN_SCORE + 1:
+                min_score = val + 2 * self.MIN_SCORE - self.MAX_SCORE - 2
                 if alpha < min_score:
                     alpha = min_score
                     if alpha >= beta:
                         return alpha
             else:
-                max_score = val + Position.MIN_SCORE - 1
+                max_score = val + self.MIN_SCORE - 1
                 if beta > max_score:
                     beta = max_score
                     if alpha >= beta:
                         return beta
 
-        moves = MoveSorter(self.width)
+        if self.book is not None and not self.book.weak:
+            score = self.book.get(P)
+            if score is not None:
+                return score
+
+        moves = self.sorters[P.nb_moves()]
+        moves.reset()  # an aborted search may have left moves in it
         for i in reversed(range(self.width)):  # Iterate from the last to first for MoveSorter
-            move = possible & Position.column_mask(self.column_order[i])
+            move = possible & self.column_masks[i]
             if move:
-                moves.add(move, P.move_score(move))  # Adjust the move_score method accordingly
+                moves.add(move, self.move_score(P, move))
 
         while True:
             next_move = moves.get_next()
             if not next_move:
                 break
-            P2 = P.clone()  # Make sure to implement clone method in Position or use copy.deepcopy
-            P2.play(next_move)
-            score = -self.negamax(P2, -beta, -alpha)
+            P.play(next_move)  # make/unmake instead of cloning the position for every child
+            try:
+                score = -self.negamax(P, -beta, -alpha)
+            finally:
+                P.undo()  # also when the search is aborted
             if score >= beta:
-                self.trans_table.put(key, score + Position.MAX_SCORE - 2 * Position.MIN_SCORE + 2)
+                self.trans_table.put(key, score + self.MAX_SCORE - 2 * self.MIN_SCORE + 2)
                 return score
             if score > alpha:
                 alpha = score
 
-        self.trans_table.put(key, alpha - Position.MIN_SCORE + 1)
+        self.trans_table.put(key, alpha - self.MIN_SCORE + 1)
         return alpha
 
     def solve(self, P, weak=False):
+        return self.solve_bounded(P, None, weak).score
+
+    def solve_bounded(self, P, control=None, weak=False):
+        """
+        Null-window search narrowing [min_score, max_score] until it closes or control stops it.
+        Returns a SearchResult with the bounds reached and whether the solve finished.
+        """
+        if (P.WIDTH, P.HEIGHT) != (self.width, self.height):
+            raise ValueError(f"Solver for {self.width}x{self.height} boards got a {P.WIDTH}x{P.HEIGHT} position")
         if P.can_win_next():
-            return (Position.WIDTH * Position.HEIGHT + 1 - P.nb_moves()) // 2
-
-        min_score = -(Position.WIDTH * Position.HEIGHT - P.nb_moves()) // 2
-        max_score = (Position.WIDTH * Position.HEIGHT + 1 - P.nb_moves()) // 2
+            score = (self.cells + 1 - P.nb_moves()) // 2
+            score = 1 if weak else score
+            return SearchResult(score, score, True)
+
+        if self.book is not None and (weak or not self.book.weak):
+            score = self.book.get(P)
+            if score is not None:
+                score = (score > 0) - (score < 0) if weak else score
+                return SearchResult(score, score, True)
+
+        min_score = -((self.cells - P.nb_moves()) // 2)
+        max_score = (self.cells + 1 - P.nb_moves()) // 2
         if weak:
             min_score = -1
             max_score = 1
 
-        while min_score < max_score:
-            med = min_score + (max_score - min_score) // 2
-            if med <= 0 and min_score // 2 < med:
-                med = min_score // 2
-            elif med >= 0 and max_score // 2 > med:
-                med = max_score // 2
-            r = self.negamax(P, med, med + 1)
-            if r <= med:
-                max_score = r
-            else:
-                min_score = r
-
-        return min_score
+        nodes = self.node_count
+        self.control = control
+        try:
+            while min_score < max_score:
+                med = min_score + (max_score - min_score) // 2
+                if med <= 0 and min_score // 2 < med:
+                    med = min_score // 2
+                elif med >= 0 and max_score // 2 > med:
+                    med = max_score // 2
+                r = self.negamax(P, med, med + 1)
+                # fail-soft scores can fall outside the weak [-1, 1] range, keep the bounds inside it
+                if r <= med:
+                    max_score = max(r, min_score)
+                else:
+                    min_score = min(r, max_score)
+        except SearchAborted:
+            return SearchResult(min_score, max_score, False, self.node_count - nodes)
+        finally:
+            self.control = None
+
+        return SearchResult(min_score, min_score, True, self.node_count - nodes)
@@ -1,21 +1,118 @@
-from math import ceil, log2
+import mmap
+import struct
+from array import array
+
+# Saved table layout: a 16-byte header (magic, key_size, value_size, log_size, sparse) followed by
+# either every slot (dense) or the occupied slots as uint32 indexes then their entries (sparse)
+MAGIC = b'C4TT'
+HEADER = struct.Struct('<4sBBBBI4x')
+
+
+def has_factor(n, min_factor, max_factor):
+    # True if n has a divisor in [min_factor, max_factor)
+    if min_factor * min_factor > n:
+        return False
+    for factor in range(min_factor, max_factor):
+        if factor * factor > n:
+            return False
+        if n % factor == 0:
+            return True
+    return False
+
+
+def next_prime(n):
+    # Smallest prime greater than or equal to n
+    while n < 2 or has_factor(n, 2, n):
+        n += 1
+    return n
+
 
 class TranspositionTable:
+    """
+    Fixed-size hash table mapping position keys to small values.
+
+    The table has a prime number of slots (the smallest prime >= 2**log_size) and each
+    slot is a single 64-bit word packing (partial key, value). Only the low
+    key_size - log_size bits of the key are stored: together with the slot index
+    (key % size) they identify the key uniquely by the Chinese remainder theorem,
+    because size * 2**(key_size - log_size) >= 2**key_size.
+    A put always overwrites whatever entry occupied the slot.
+    """
+
     def __init__(self, key_size, value_size, log_size):
-        # key_size and value_size are included for completeness and potential future use,
-        # but they don't directly affect the implementation in a dynamic language like Python.
-        self.size = 2 ** ceil(log2(2 ** log_size))  # Actual size as a power of 2
-        self.entries = {}
+        self.key_size = key_size
+        self.value_size = value_size
+        self.log_size = log_size
+        self.size = next_prime(1 << log_size)
+
+        partial_key_size = max(key_size - log_size, 0)
+        if partial_key_size + value_size > 64:
+            raise ValueError("Partial key and value do not fit in a 64-bit entry")
+        self.key_mask = (1 << partial_key_size) - 1
+        self.value_mask = (1 << value_size) - 1
+
+        self.entries = array('Q', [0]) * self.size
 
     def reset(self):
-        self.entries.clear()
+        self.entries = array('Q', [0]) * self.size
 
     def put(self, key, value):
-        if value == 0:
-            # Zero is used to encode missing data, hence we remove the key if value is 0
-            self.entries.pop(key, None)  # Use pop for a cleaner deletion
-        else:
-            self.entries[key] = value
+        # A value of 0 is used to encode missing data
+        self.entries[key % self.size] = ((key & self.key_mask) << self.value_size) | value
 
     def get(self, key):
-        return self.entries.get(key, 0)
+        entry = self.entries[key % self.size]
+        if entry >> self.value_size == key & self.key_mask:
+            return entry & self.value_mask
+        return 0
+
+    def occupied_by_other(self, key):
+        # True if a put of key would overwrite another key's entry
+        entry = self.entries[key % self.size]
+        return entry != 0 and entry >> self.value_size != key & self.key_mask
+
+    def save(self, path, sparse=None):
+        """
+        Write the table to path. Sparse files hold only the occupied slots (12 bytes each) and are
+        smaller while the table is less than 2/3 full; by default the smaller layout is chosen.
+        """
+        occupied = [i for i, entry in enumerate(self.entries) if entry]
+        if sparse is None:
+            sparse = 12 * len(occupied) < 8 * self.size
+        with open(path, 'wb') as f:
+            f.write(HEADER.pack(MAGIC, self.key_size, self.value_size, self.log_size, sparse, len(occupied)))
+            if sparse:
+                array('I', occupied).tofile(f)
+                array('Q', (self.entries[i] for i in occupied)).tofile(f)
+            else:
+                f.write(self.entries)
+        return len(occupied)
+
+    @classmethod
+    def load(cls, path):
+        """
+        Table saved by save(). A dense file is memory-mapped copy-on-write, so loading is
+        instant, pages are read as the search touches them and writes stay private to the process.
+        """
+        with open(path, 'rb') as f:
+            magic, key_size, value_size, log_size, sparse, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a saved transposition table")
+            table = cls.__new__(cls)
+            table.key_size = key_size
+            table.value_size = value_size
+            table.log_size = log_size
+            table.size = next_prime(1 << log_size)
+            table.key_mask = (1 << max(key_size - log_size, 0)) - 1
+            table.value_mask = (1 << value_size) - 1
+            if sparse:
+                indexes, entries = array('I'), array('Q')
+                indexes.fromfile(f, count)
+                entries.fromfile(f, count)
+                table.entries = array('Q', [0]) * table.size
+                for i, entry in zip(indexes, entries):
+                    table.entries[i] = entry
+            else:
+                table.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+                table.entries = memoryview(table.mmap)[HEADER.size:].cast('Q')
+        return table
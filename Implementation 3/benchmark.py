@@ -0,0 +1,457 @@
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # for the shared SearchControl
+
+from MoveOrdering import ORDERINGS
+from MoveSorter import MoveSorter
+from ParallelSolver import ParallelSolver
+from Position import Position, position_class
+from PositionBatch import random_positions
+from SearchControl import SearchControl
+from benchmark_suite import load_test_set
+from Solver import Solver
+from TranspositionTable import TranspositionTable
+from simulator import generate_position
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+
+class DictTranspositionTable:
+    # The previous unbounded dict-backed table, kept as a baseline for comparison
+    def __init__(self, key_size, value_size, log_size):
+        self.entries = {}
+
+    def reset(self):
+        self.entries.clear()
+
+    def put(self, key, value):
+        if value == 0:
+            self.entries.pop(key, None)
+        else:
+            self.entries[key] = value
+
+    def get(self, key):
+        return self.entries.get(key, 0)
+
+
+class InsortMoveSorter:
+    # The previous sorter (insort with a key, pop(0)), kept as a baseline for comparison
+    def __init__(self, width):
+        self.entries = []
+
+    def add(self, move, score):
+        from bisect import insort_left
+        insort_left(self.entries, (score, move), key=lambda x: -x[0])
+
+    def get_next(self):
+        if self.entries:
+            return self.entries.pop(0)[1]
+        return 0
+
+    def reset(self):
+        self.entries = []
+
+
+class FreshSorters:
+    # Stands in for Solver.sorters and hands out a new baseline sorter at every node, as before
+    def __init__(self, width):
+        self.width = width
+
+    def __getitem__(self, depth):
+        return InsortMoveSorter(self.width)
+
+
+TABLES = {
+    'dict': DictTranspositionTable,
+    'array': TranspositionTable,
+}
+
+
+class CountingTranspositionTable(TranspositionTable):
+    def __init__(self, key_size, value_size, log_size):
+        super().__init__(key_size, value_size, log_size)
+        self.probes = 0
+        self.hits = 0
+
+    def get(self, key):
+        value = super().get(key)
+        self.probes += 1
+        if value:
+            self.hits += 1
+        return value
+
+
+class AsymmetricPosition(Position):
+    # Position keyed without folding mirror images together, for comparison
+    def key(self):
+        return self.current_position + self.mask
+
+
+def symmetric_position(num_rounds):
+    """
+    Random left-right symmetric position: each round plays a, b, mirror(a), mirror(b), so both
+    players' stones are mirrored and the children of the position come in mirrored pairs.
+    """
+    while True:
+        moves = ""
+        for _ in range(num_rounds):
+            a, b = np.random.randint(1, Position.WIDTH + 1, size=2)
+            moves += f"{a}{b}{Position.WIDTH + 1 - a}{Position.WIDTH + 1 - b}"
+        position = Position()
+        if position.play(moves) == len(moves) and not position.can_win_next():
+            return moves
+
+
+def peak_rss_mb():
+    if resource is None:
+        return float('nan')
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return rss / (1024 * 1024) if sys.platform == 'darwin' else rss / 1024
+
+
+def run_table_benchmark(table_name, sequences, log_size=22):
+    # Runs in a fresh process so that the peak RSS only reflects this table
+    trans_table = TABLES[table_name](key_size=Position.WIDTH * (Position.HEIGHT + 1), value_size=8,
+                                     log_size=log_size)
+    solver = Solver(trans_table=trans_table)
+    start_time = time.time()
+    for moves in sequences:
+        position = Position()
+        position.play(moves)
+        solver.solve(position, weak=False)
+    elapsed_time = time.time() - start_time
+    nodes = solver.node_count
+    return {
+        'table': table_name,
+        'positions': len(sequences),
+        'nodes': nodes,
+        'time': elapsed_time,
+        'nodes_per_second': nodes / elapsed_time if elapsed_time > 0 else 0,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def benchmark_transposition_tables(move_count=20, num_positions=20, log_size=22, seed=0):
+    """
+    Solve the same random positions from simulator.generate_position with the dict-backed
+    and the fixed-size table. The table is shared across the whole run, as in a long solve.
+    """
+    np.random.seed(seed)
+    sequences = [generate_position(move_count)[1] for _ in range(num_positions)]
+
+    results = []
+    for table_name in TABLES:
+        with ProcessPoolExecutor(max_workers=1) as executor:
+            results.append(executor.submit(run_table_benchmark, table_name, sequences, log_size).result())
+
+    for result in results:
+        print(f"{result['table']:>6}: {result['nodes']} nodes in {result['time']:.2f} s, "
+              f"{result['nodes_per_second']:.0f} nodes/s, peak RSS {result['peak_rss_mb']:.1f} MB")
+    return results
+
+
+def benchmark_symmetric_keys(num_rounds=4, num_positions=10, seed=0):
+    """Transposition table hits with plain keys against mirror-canonical keys on symmetric openings."""
+    np.random.seed(seed)
+    sequences = [symmetric_position(num_rounds) for _ in range(num_positions)]
+
+    results = []
+    for name, position_class in (('plain', AsymmetricPosition), ('mirror', Position)):
+        trans_table = CountingTranspositionTable(key_size=Position.WIDTH * (Position.HEIGHT + 1), value_size=8,
+                                                 log_size=22)
+        solver = Solver(trans_table=trans_table)
+        nodes = 0
+        start_time = time.time()
+        for moves in sequences:
+            position = position_class()
+            position.play(moves)
+            solver.reset()
+            solver.solve(position, weak=False)
+            nodes += solver.node_count
+        elapsed_time = time.time() - start_time
+        results.append({
+            'key': name,
+            'nodes': nodes,
+            'probes': trans_table.probes,
+            'hits': trans_table.hits,
+            'time': elapsed_time,
+        })
+
+    for result in results:
+        hit_rate = result['hits'] / result['probes'] if result['probes'] else 0
+        print(f"{result['key']:>6}: {result['hits']}/{result['probes']} hits ({hit_rate:.1%}), "
+              f"{result['nodes']} nodes in {result['time']:.2f} s")
+    return results
+
+
+def count_nodes_clone(position, depth):
+    # Full-width traversal copying the position for every child, as negamax used to
+    if depth == 0:
+        return 1
+    nodes = 1
+    for col in range(Position.WIDTH):
+        if position.can_play(col):
+            child = position.clone()
+            child.playCol(col)
+            nodes += count_nodes_clone(child, depth - 1)
+    return nodes
+
+
+def count_nodes_undo(position, depth):
+    # Same traversal with make/unmake on a single position
+    if depth == 0:
+        return 1
+    nodes = 1
+    for col in range(Position.WIDTH):
+        if position.can_play(col):
+            position.playCol(col)
+            nodes += count_nodes_undo(position, depth - 1)
+            position.undo()
+    return nodes
+
+
+def benchmark_make_unmake(min_moves=20, max_moves=30, depth=4, num_positions=5, seed=0):
+    """Node throughput of clone-per-child against play/undo on positions of 20-30 moves."""
+    np.random.seed(seed)
+    results = []
+    for move_count in range(min_moves, max_moves + 1, 2):
+        positions = [generate_position(move_count)[0] for _ in range(num_positions)]
+        result = {'move_count': move_count}
+        for name, count_nodes in (('clone', count_nodes_clone), ('undo', count_nodes_undo)):
+            start_time = time.time()
+            nodes = sum(count_nodes(position, depth) for position in positions)
+            elapsed_time = time.time() - start_time
+            result[name] = nodes / elapsed_time if elapsed_time > 0 else 0
+        results.append(result)
+        print(f"{move_count} moves: clone {result['clone']:.0f} nodes/s, undo {result['undo']:.0f} nodes/s "
+              f"({result['undo'] / result['clone']:.2f}x)")
+    return results
+
+
+def benchmark_batch(num_positions=100000, move_count=20, seed=0):
+    """Positions per second for generating and classifying random positions, one by one and as a batch."""
+    np.random.seed(seed)
+    num_scalar = max(num_positions // 50, 1)  # the scalar loop is far slower, time a sample of it
+
+    start_time = time.time()
+    positions = [generate_position(move_count)[0] for _ in range(num_scalar)]
+    scalar_generate = num_scalar / (time.time() - start_time)
+    start_time = time.time()
+    for position in positions:
+        position.possible_non_losing_moves()
+        position.can_win_next()
+    scalar_classify = num_scalar / (time.time() - start_time)
+
+    start_time = time.time()
+    batch, _ = random_positions(num_positions, move_count, np.random.default_rng(seed))
+    batch_generate = num_positions / (time.time() - start_time)
+    start_time = time.time()
+    batch.possible_non_losing_moves()
+    batch.can_win_next()
+    batch_classify = num_positions / (time.time() - start_time)
+
+    print(f"generate: scalar {scalar_generate:.0f} positions/s, batch {batch_generate:.0f} positions/s")
+    print(f"classify: scalar {scalar_classify:.0f} positions/s, batch {batch_classify:.0f} positions/s")
+    return {
+        'scalar_generate': scalar_generate, 'batch_generate': batch_generate,
+        'scalar_classify': scalar_classify, 'batch_classify': batch_classify,
+    }
+
+
+def benchmark_time_budget(move_count=14, num_positions=20, seed=0, budgets=(10, 100, 1000)):
+    """
+    Accuracy of Solver.solve_bounded under time budgets (ms) against the exact scores:
+    how often the solve finished, how often the returned score is exact, and how often
+    its sign (win/draw/loss) is right. Every solve starts from an empty table.
+    """
+    _, sequences = random_positions(num_positions, move_count, np.random.default_rng(seed))
+    solver = Solver()
+    exact = []
+    for moves in sequences:
+        position = Position()
+        position.play(moves)
+        solver.reset()
+        exact.append(solver.solve(position))
+
+    results = []
+    for budget in budgets:
+        finished = correct = correct_sign = nodes = 0
+        for moves, score in zip(sequences, exact):
+            position = Position()
+            position.play(moves)
+            solver.reset()
+            result = solver.solve_bounded(position, SearchControl(budget))
+            finished += result.finished
+            correct += result.score == score
+            correct_sign += (result.score > 0) - (result.score < 0) == (score > 0) - (score < 0)
+            nodes += result.nodes
+        results.append({
+            'budget_ms': budget, 'finished': finished / num_positions, 'exact': correct / num_positions,
+            'correct_sign': correct_sign / num_positions, 'mean_nodes': nodes / num_positions,
+        })
+        print(f"{budget:>5} ms: finished {finished}/{num_positions}, exact {correct}/{num_positions}, "
+              f"correct sign {correct_sign}/{num_positions}, {nodes / num_positions:.0f} nodes per position")
+    return results
+
+
+def benchmark_move_sorter(move_count=16, num_positions=10, seed=0, repeat=100000):
+    """
+    Time of the sorter alone (7 adds and 8 get_next per node) and time per node of full solves,
+    with the per-depth preallocated sorters and with a new insort-based sorter at every node.
+    """
+    rng = random.Random(seed)
+    scores = [[rng.randint(0, 4) for _ in range(Position.WIDTH)] for _ in range(1000)]
+    results = {}
+    for name, make_sorter in (('insort', lambda: InsortMoveSorter(Position.WIDTH)),
+                              ('preallocated', None)):
+        sorter = MoveSorter(Position.WIDTH)
+        start_time = time.time()
+        for i in range(repeat):
+            if make_sorter is None:
+                sorter.reset()
+            else:
+                sorter = make_sorter()
+            for col, score in enumerate(scores[i % len(scores)]):
+                sorter.add(1 << col, score)
+            while sorter.get_next():
+                pass
+        results[name] = {'sorter_us': (time.time() - start_time) / repeat * 1e6}
+
+    _, sequences = random_positions(num_positions, move_count, np.random.default_rng(seed))
+    solver = Solver()
+    preallocated = solver.sorters
+    for name, sorters in (('insort', FreshSorters(Position.WIDTH)), ('preallocated', preallocated)):
+        solver.sorters = sorters
+        nodes, elapsed = 0, 0.0
+        for moves in sequences:
+            position = Position()
+            position.play(moves)
+            solver.reset()
+            start_time = time.time()
+            solver.solve(position)
+            elapsed += time.time() - start_time
+            nodes += solver.node_count
+        results[name]['solve_us_per_node'] = elapsed / nodes * 1e6
+
+    for name, result in results.items():
+        print(f"{name:>12}: sorter {result['sorter_us']:.2f} us per node, "
+              f"solve {result['solve_us_per_node']:.2f} us per node")
+    return results
+
+
+def benchmark_move_ordering(num_positions=10, seed=0, move_counts=(18, 22, 26, 30)):
+    """
+    Nodes searched and time to solve the same random positions with each heuristic of
+    MoveOrdering, for positions at several game depths. Every solve starts from an empty table.
+    """
+    results = []
+    for move_count in move_counts:
+        _, sequences = random_positions(num_positions, move_count, np.random.default_rng(seed))
+        for name, move_score in ORDERINGS.items():
+            solver = Solver(move_score=move_score)
+            nodes, elapsed = 0, 0.0
+            for moves in sequences:
+                position = Position()
+                position.play(moves)
+                solver.reset()
+                start_time = time.time()
+                solver.solve(position)
+                elapsed += time.time() - start_time
+                nodes += solver.node_count
+            results.append({'moves': move_count, 'ordering': name, 'nodes': nodes, 'time': elapsed})
+            print(f"{move_count} moves, {name:>7}: {nodes / num_positions:.0f} nodes per position, "
+                  f"{elapsed / num_positions:.3f} s per position")
+    return results
+
+
+def benchmark_board_sizes(num_positions=10, empty_cells=16, seed=0,
+                          sizes=((4, 4), (5, 4), (5, 5), (6, 5), (6, 6), (7, 6), (8, 7), (8, 8))):
+    """
+    Solve random positions with empty_cells cells left on every board size, with a Solver
+    and Position class generated for the size.
+    """
+    rng = random.Random(seed)
+    results = []
+    for width, height in sizes:
+        position_type = position_class(width, height)
+        solver = Solver(width, height)
+        nodes, elapsed, solved = 0, 0.0, 0
+        while solved < num_positions:
+            position = position_type()
+            for _ in range(max(width * height - empty_cells, 0)):
+                cols = [col for col in range(width) if position.can_play(col) and not position.is_winning_move(col)]
+                if not cols:
+                    break
+                position.playCol(rng.choice(cols))
+            if position.nb_moves() < width * height - empty_cells or position.can_win_next():
+                continue  # the game ended early, draw another one
+            solver.reset()
+            start_time = time.time()
+            solver.solve(position)
+            elapsed += time.time() - start_time
+            nodes += solver.node_count
+            solved += 1
+        results.append({'width': width, 'height': height, 'nodes': nodes, 'time': elapsed})
+        print(f"{width}x{height}: {nodes / num_positions:.0f} nodes, {elapsed / num_positions * 1000:.1f} ms "
+              f"per position, {nodes / elapsed:.0f} nodes/s")
+    return results
+
+
+def benchmark_parallel(num_positions=5, max_workers=8, test_set='begin_hard'):
+    """
+    Wall time of ParallelSolver in each mode with 1, 2, 4 and 8 workers (up to max_workers) on
+    the first positions of a benchmark_suite test set (begin_hard has 12 to 15 moves), and the
+    speedup over one worker.
+    """
+    positions = load_test_set(test_set)[:num_positions]
+    worker_counts = [n for n in (1, 2, 4, 8) if n <= max_workers]
+    if max(worker_counts) > os.cpu_count():
+        print(f"Only {os.cpu_count()} cores, more workers than that cannot be faster")
+    results = []
+    for mode in ('root', 'probes', 'lazy'):
+        base_time = None
+        for workers in worker_counts:
+            solver = ParallelSolver(workers, mode)
+            start_time = time.time()
+            correct = sum(solver.solve(moves) == score for moves, score in positions)
+            elapsed = time.time() - start_time
+            solver.close()
+            base_time = base_time or elapsed
+            results.append({'mode': mode, 'workers': workers, 'time': elapsed, 'nodes': solver.node_count,
+                            'speedup': base_time / elapsed, 'correct': correct})
+            print(f"{mode:>6}, {workers} workers: {elapsed:.2f} s, {solver.node_count} nodes, "
+                  f"speedup {base_time / elapsed:.2f}, {correct}/{len(positions)} correct")
+    return results
+
+
+BENCHMARKS = {
+    'tables': benchmark_transposition_tables,
+    'symmetry': benchmark_symmetric_keys,
+    'undo': benchmark_make_unmake,
+    'batch': benchmark_batch,
+    'budget': benchmark_time_budget,
+    'sorter': benchmark_move_sorter,
+    'ordering': benchmark_move_ordering,
+    'sizes': benchmark_board_sizes,
+    'parallel': benchmark_parallel,
+}
+
+
+def main():
+    # usage: python benchmark.py [name] [int arguments passed to the benchmark function...]
+    name = sys.argv[1] if len(sys.argv) > 1 else 'tables'
+    BENCHMARKS[name](*(int(arg) for arg in sys.argv[2:]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+"""
+Standard test sets and a regression runner for Connect 4 solvers.
+
+The expected scores in test_sets/ were computed by this repo's own Solver, so checking the
+Solver against them only catches regressions, not errors it had when the sets were generated.
+To check the expectations themselves, run the suite on an independent solver with --command,
+e.g. the compiled solver: anything short of all correct means a wrong expected score.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from Position import Position
+from PositionBatch import random_positions
+from Solver import Solver
+from TranspositionTable import TranspositionTable
+
+TEST_SET_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'test_sets')
+
+# Number of moves played in the positions of each phase of the game
+PHASES = {
+    'begin': (12, 15),
+    'middle': (16, 23),
+    'end': (24, 32),
+}
+EASY_NODES = 10000  # positions Solver solves in fewer nodes than this are easy, the others hard
+TEST_SETS = ['end_easy', 'middle_easy', 'middle_hard', 'begin_easy', 'begin_hard']
+
+
+def generate_test_sets(size=10, seed=0, directory=TEST_SET_DIR):
+    """
+    Write size random positions per test set to directory/<phase>_<difficulty>.txt, one
+    "moves score" line per position with the score Solver finds for the player to move. Positions
+    are drawn with a seeded generator and sorted into easy and hard by the nodes Solver needs.
+    """
+    rng = np.random.default_rng(seed)
+    solver = Solver()
+    os.makedirs(directory, exist_ok=True)
+    for phase, (min_moves, max_moves) in PHASES.items():
+        names = [name for name in TEST_SETS if name.startswith(phase + '_')]
+        lines = {name: [] for name in names}
+        while any(len(lines[name]) < size for name in names):
+            _, sequences = random_positions(1, int(rng.integers(min_moves, max_moves + 1)), rng)
+            position = Position()
+            position.play(sequences[0])
+            solver.reset()
+            score = solver.solve(position)
+            name = f"{phase}_{'easy' if solver.node_count < EASY_NODES else 'hard'}"
+            if name in lines and len(lines[name]) < size:
+                lines[name].append(f"{sequences[0]} {score}")
+        for name in names:
+            with open(os.path.join(directory, name + '.txt'), 'w') as f:
+                f.write('\n'.join(lines[name]) + '\n')
+            print(f"Wrote {len(lines[name])} positions to {name}.txt")
+
+
+def load_test_set(name, directory=TEST_SET_DIR):
+    # [(moves, expected score)] of a test set file
+    with open(os.path.join(directory, name + '.txt')) as f:
+        return [(moves, int(score)) for moves, score in (line.split() for line in f if line.strip())]
+
+
+class SolverBackend:
+    """
+    Implementation 3's Solver in this process. The table is emptied before every position
+    unless keep_table is set; table_path starts from a table saved by TranspositionTable.save.
+    """
+
+    def __init__(self, weak=False, keep_table=False, table_path=None):
+        self.solver = Solver(trans_table=TranspositionTable.load(table_path) if table_path else None)
+        self.weak = weak
+        self.keep_table = keep_table
+
+    def solve(self, moves):
+        # (score, nodes, seconds) for the player to move after moves
+        position = Position()
+        if position.play(moves) != len(moves):
+            raise ValueError(f"Invalid move sequence: {moves}")
+        if not self.keep_table:
+            self.solver.reset()
+        nodes = self.solver.node_count
+        start_time = time.perf_counter()
+        score = self.solver.solve(position, self.weak)
+        return score, self.solver.node_count - nodes, time.perf_counter() - start_time
+
+    def close(self):
+        pass
+
+
+class CommandBackend:
+    """
+    An external solver speaking the line protocol of the compiled solver: one move string per
+    input line, answered by "moves score nodes microseconds".
+    """
+
+    def __init__(self, command, weak=False):
+        self.process = subprocess.Popen(command + (['-w'] if weak else []), stdin=subprocess.PIPE,
+                                        stdout=subprocess.PIPE, text=True, bufsize=1)
+
+    def solve(self, moves):
+        self.process.stdin.write(moves + '\n')
+        self.process.stdin.flush()
+        output = self.process.stdout.readline().split()
+        if not output:
+            raise ValueError(f"Invalid move sequence: {moves}")
+        score, nodes, microseconds = (int(part) for part in output[-3:])
+        return score, nodes, microseconds / 1e6
+
+    def close(self):
+        self.process.stdin.close()
+        self.process.wait()
+
+
+def run_suite(backend, names=TEST_SETS, weak=False, directory=TEST_SET_DIR):
+    """
+    Solve every position of the named test sets with backend. Returns {set name: metrics} with
+    the mean time, mean nodes, nodes per second and the fraction of correct scores; in weak mode
+    only the sign of the expected score is checked.
+    """
+    results = {}
+    for name in names:
+        test_set = load_test_set(name, directory)
+        total_time, total_nodes, correct = 0.0, 0, 0
+        for moves, expected in test_set:
+            score, nodes, seconds = backend.solve(moves)
+            if weak:
+                expected = (expected > 0) - (expected < 0)
+            correct += score == expected
+            total_time += seconds
+            total_nodes += nodes
+        results[name] = {
+            'positions': len(test_set),
+            'mean_time': total_time / len(test_set),
+            'mean_nodes': total_nodes / len(test_set),
+            'nodes_per_second': total_nodes / total_time if total_time > 0 else 0.0,
+            'correct': correct / len(test_set),
+        }
+        print(f"{name:>12}: {results[name]['mean_time'] * 1000:9.2f} ms, "
+              f"{results[name]['mean_nodes']:10.0f} nodes, {results[name]['nodes_per_second']:8.0f} nodes/s, "
+              f"{correct}/{len(test_set)} correct")
+    return results
+
+
+def find_regressions(results, baseline, time_tolerance=0.5, node_tolerance=0.05):
+    """
+    Differences from a saved baseline that count as regressions: any drop in correctness, mean
+    nodes up by more than node_tolerance or mean time up by more than time_tolerance (relative).
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        base = baseline[name]
+        if result['correct'] < base['correct']:
+            regressions.append(f"{name}: correct {result['correct']:.0%} < {base['correct']:.0%}")
+        if result['mean_nodes'] > base['mean_nodes'] * (1 + node_tolerance):
+            regressions.append(f"{name}: mean nodes {result['mean_nodes']:.0f} > {base['mean_nodes']:.0f}")
+        if result['mean_time'] > base['mean_time'] * (1 + time_tolerance):
+            regressions.append(f"{name}: mean time {result['mean_time'] * 1000:.2f} ms "
+                               f"> {base['mean_time'] * 1000:.2f} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve the standard test sets and compare with a baseline.")
+    parser.add_argument('--generate', action='store_true', help="write new test sets instead of running them")
+    parser.add_argument('--size', type=int, default=10, help="positions per generated test set")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--sets', nargs='+', default=TEST_SETS, choices=TEST_SETS)
+    parser.add_argument('--command', nargs='+', help="external solver command, Implementation 3's Solver by default")
+    parser.add_argument('-w', '--weak', action='store_true', help="only solve win/draw/loss")
+    parser.add_argument('--keep-table', action='store_true', help="keep the table between positions")
+    parser.add_argument('--table', help="start from this saved transposition table")
+    parser.add_argument('--save-table', help="save the transposition table here at the end")
+    parser.add_argument('--output', help="write the results to this JSON file")
+    parser.add_argument('--baseline', help="fail if the results regress against this JSON file")
+    parser.add_argument('--save-baseline', action='store_true', help="write the results to --baseline instead")
+    args = parser.parse_args()
+
+    if args.generate:
+        generate_test_sets(args.size, args.seed)
+        return
+
+    if args.command:
+        backend = CommandBackend(args.command, args.weak)
+    else:
+        backend = SolverBackend(args.weak, args.keep_table, args.table)
+    try:
+        results = run_suite(backend, args.sets, args.weak)
+        if args.save_table and not args.command:
+            backend.solver.trans_table.save(args.save_table)
+    finally:
+        backend.close()
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.baseline and args.save_baseline:
+        with open(args.baseline, 'w') as f:
+            json.dump(results, f, indent=2)
+    elif args.baseline:
+        with open(args.baseline) as f:
+            regressions = find_regressions(results, json.load(f))
+        for regression in regressions:
+            print("Regression:", regression)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
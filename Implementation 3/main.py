@@ -1,41 +1,156 @@
+import argparse
+import json
+import os
 import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))  # for the shared SearchControl
+
+from OpeningBook import Book
 from Position import Position
-from MoveSorter import MoveSorter
+from SearchControl import SearchControl
 from Solver import Solver
-import time
+from TranspositionTable import TranspositionTable
 
+_solver = None  # one per process, never reset, so its table stays warm from one position to the next
 
-def main():
-    solver = Solver()
-    weak = '-w' in sys.argv
-
-    # for line in sys.stdin:
-    #     line = line.strip()
-    #     if not line:
-    #         continue
-    #
-    #     position = Position()
-    #     if position.play(line) != len(line):
-    #         sys.stderr.write(f"Invalid move in line: {line}\n")
-    #     else:
-    #         solver.reset()
-    #         start_time = time.time()
-    #         score = solver.solve(position, weak)
-    #         end_time = time.time()
-    #
-    #         elapsed_time = (end_time - start_time) * 1e6  # convert to microseconds
-    #         print(f"{line} {score} {solver.node_count} {int(elapsed_time)}")
-
-    # After setting up the board with "443456"
+
+def _init_solver(book_path, table_path):
+    global _solver
+    _solver = Solver(trans_table=TranspositionTable.load(table_path) if table_path else None,
+                     book=Book(book_path) if book_path else None)
+
+
+def solve_line(moves, weak=False, time_limit_ms=None):
+    """
+    Solve the position after moves with this process's solver. Returns a dict with the moves,
+    the score (None if the time limit ran out first, with the bounds proven so far in lower and
+    upper), nodes and microseconds, or with an error for an invalid move sequence.
+    """
     position = Position()
-    position.play("123")
-    print("Current board state:")
-    print(position.board_to_array())  # Assuming this method prints a human-readable board
-
-    if position.can_win_next():
-        print("Win next move is possible!")
-    else:
-        print("No immediate win detected.")
+    if (not all(char.isdigit() and 1 <= int(char) <= Position.WIDTH for char in moves)
+            or position.play(moves) != len(moves)):
+        return {'moves': moves, 'error': "invalid move sequence"}
+    nodes = _solver.node_count
+    start_time = time.perf_counter()
+    control = SearchControl(time_limit_ms) if time_limit_ms else None
+    result = _solver.solve_bounded(position, control, weak)
+    return {
+        'moves': moves,
+        'score': result.score if result.finished else None,
+        'lower': result.lower,
+        'upper': result.upper,
+        'nodes': _solver.node_count - nodes,
+        'microseconds': int((time.perf_counter() - start_time) * 1e6),
+    }
+
+
+def format_result(result, as_json=False):
+    # "moves score nodes microseconds" like the compiled solver, "lower..upper" for unfinished scores
+    if as_json:
+        return json.dumps(result)
+    if 'error' in result:
+        return ''
+    score = result['score'] if result['score'] is not None else f"{result['lower']}..{result['upper']}"
+    return f"{result['moves']} {score} {result['nodes']} {result['microseconds']}"
+
+
+class ResultWriter:
+    """Writes results as they arrive, one flushed line each, from any thread."""
+
+    def __init__(self, output, as_json=False):
+        self.output = output
+        self.as_json = as_json
+        self.lock = threading.Lock()
+
+    def write(self, result):
+        if 'error' in result:
+            sys.stderr.write(f"Line {result['moves']}: {result['error']}\n")
+        with self.lock:
+            self.output.write(format_result(result, self.as_json) + '\n')
+            self.output.flush()
+
+
+def read_moves(lines):
+    # Move strings of the non-empty lines; only the first field counts, so "moves score" files work too
+    for line in lines:
+        fields = line.split()
+        if fields:
+            yield fields[0]
+
+
+def solve_stream(lines, writer, weak=False, time_limit_ms=None, workers=1, max_pending=None,
+                 book_path=None, table_path=None, save_table=None):
+    """
+    Solve every move string read from lines and hand each result to writer as soon as it is done.
+
+    With one worker the positions are solved in order in this process. With more, they are
+    solved in a pool of processes that each keep a warm solver, and results are written in the
+    order they complete. Input is read lazily and at most max_pending positions are in flight,
+    so memory stays flat however long the input is.
+    """
+    if workers <= 1:
+        _init_solver(book_path, table_path)
+        for moves in read_moves(lines):
+            writer.write(solve_line(moves, weak, time_limit_ms))
+        if save_table:
+            _solver.trans_table.save(save_table)
+        return
+
+    slots = threading.BoundedSemaphore(max_pending or 4 * workers)
+    stopped = threading.Event()  # set when the output is gone, e.g. | head
+
+    def done(future, moves):
+        slots.release()
+        if stopped.is_set():  # also covers the futures cancelled after the stop
+            return
+        error = future.exception()  # a failed solve still gets its output line
+        try:
+            writer.write({'moves': moves, 'error': str(error)} if error else future.result())
+        except OSError:  # runs on the pool's thread, so main() would never see it
+            stopped.set()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_solver,
+                             initargs=(book_path, table_path)) as executor:
+        for moves in read_moves(lines):
+            slots.acquire()  # blocks reading while max_pending positions are being solved
+            if stopped.is_set():
+                break
+            future = executor.submit(solve_line, moves, weak, time_limit_ms)
+            future.add_done_callback(lambda future, moves=moves: done(future, moves))
+        if stopped.is_set():
+            executor.shutdown(cancel_futures=True)
+    if stopped.is_set():
+        raise BrokenPipeError("output closed")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve Connect 4 positions, one move string (1-based columns) "
+                                                 "per input line, printing 'moves score nodes microseconds'.")
+    parser.add_argument('input', nargs='?', default='-', help="file of move strings, stdin by default")
+    parser.add_argument('-w', '--weak', action='store_true', help="only solve win/draw/loss")
+    parser.add_argument('-t', '--time-limit', type=int, help="milliseconds per position")
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help=f"solver processes, results come in completion order if > 1 (max {os.cpu_count()} useful)")
+    parser.add_argument('--max-pending', type=int, help="positions in flight with several workers (4 per worker)")
+    parser.add_argument('--json', action='store_true', help="write JSON lines")
+    parser.add_argument('--book', help="opening book file")
+    parser.add_argument('--table', help="start from this saved transposition table")
+    parser.add_argument('--save-table', help="save the transposition table here at the end (one worker only)")
+    args = parser.parse_args()
+
+    writer = ResultWriter(sys.stdout, args.json)
+    lines = sys.stdin if args.input == '-' else open(args.input)
+    try:
+        solve_stream(lines, writer, args.weak, args.time_limit, args.workers, args.max_pending,
+                     args.book, args.table, args.save_table)
+    except BrokenPipeError:  # the reader went away, e.g. | head
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+    finally:
+        if lines is not sys.stdin:
+            lines.close()
 
 
 if __name__ == "__main__":
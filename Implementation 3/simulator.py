@@ -7,6 +7,7 @@ import pandas as pd
 from matplotlib import pyplot as plt
 
 from Position import Position
+from PositionBatch import random_positions
 from Solver import Solver
 
 
@@ -42,7 +43,22 @@ def visualize(board):
     plt.show()
 
 
-def simulate_bulk_games(solver, num_games):
+def generate_position(move_count):
+    """Random non-terminal position with move_count moves, returned with its move string."""
+    position = Position()
+    moves = ""
+    while position.nb_moves() < move_count:
+        move = np.random.randint(1, Position.WIDTH + 1)
+        if position.play(str(move)) != 1 or position.can_win_next():
+            position = Position()  # Reset if move is invalid or game ends prematurely
+            moves = ""
+        else:
+            moves += str(move)
+    return position, moves
+
+
+def simulate_bulk_games(solver, num_games, keep_table=False):
+    # keep_table keeps the transposition table between games instead of starting each one empty
     results = []
     #get the minimum and maximum number of moves from user
     min_moves = int(input("Enter the minimum number of moves: "))
@@ -50,24 +66,19 @@ def simulate_bulk_games(solver, num_games):
     for move_count in range(min_moves, max_moves + 1):
         move_runtimes = []
         move_nodes = []
-        for _ in range(num_games):
-            position = Position()
-            moves = ""
-            while position.nb_moves() < move_count:
-                move = np.random.randint(1, Position.WIDTH + 1)
-                if position.play(str(move)) != 1 or position.can_win_next():
-                    position = Position()  # Reset if move is invalid or game ends prematurely
-                    moves = ""
-                else:
-                    moves += str(move)
+        batch, _ = random_positions(num_games, move_count)
+        for i in range(num_games):
+            position = batch.position(i)
 
             start_time = time.time()
-            solver.reset()
+            if not keep_table:
+                solver.reset()
+            nodes = solver.node_count
             solver.solve(position, weak=False)
             elapsed_time = time.time() - start_time
 
             move_runtimes.append(elapsed_time)
-            move_nodes.append(solver.node_count)
+            move_nodes.append(solver.node_count - nodes)
 
         results.append({
             'move_count': move_count,
@@ -177,7 +188,8 @@ def main():
     choice = input("Enter your choice: ")
     if choice == '1':
         num_games = int(input("Enter the number of games to simulate: "))
-        results = simulate_bulk_games(solver, num_games)
+        keep_table = input("Keep the transposition table between games? (y/n): ").strip().lower() == 'y'
+        results = simulate_bulk_games(solver, num_games, keep_table)
         plot_and_export_results(results)
     elif choice == '2':
         manual_game_entry(solver)
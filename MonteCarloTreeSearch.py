@@ -0,0 +1,170 @@
+import math
+import random
+import sys
+import time
+
+from BitboardPosition import BitboardPosition
+from SearchControl import SearchAborted, SearchControl
+
+EXPLORATION = math.sqrt(2)  # UCT exploration constant, for rewards in [0, 1]
+UNEXPANDED = -1
+NOT_TERMINAL, WON, DRAWN = 0, 1, 2  # a node's position: ongoing, won by the player who moved into it, draw
+
+
+class MCTSAgent:
+    """
+    UCT Monte Carlo tree search on a BitboardPosition.
+
+    Nodes live in preallocated parallel lists indexed by node number, with width child slots
+    per node, instead of one object per node. Nodes are found through a dict keyed by the
+    position key, so transpositions share one node and its statistics, and the tree survives
+    between moves: the next call finds the position after the opponent's reply in the dict and
+    searches on from there. When the pool runs low at the start of a move the tree is dropped.
+
+    Each move gets num_simulations rollouts per legal column, the budget of MonteCarloAgent
+    with the same num_simulations, or whatever fits in time_limit_ms if that is given.
+    """
+
+    def __init__(self, num_simulations=100, time_limit_ms=None, capacity=200000, rng=None):
+        self.num_simulations = num_simulations
+        self.time_limit_ms = time_limit_ms
+        self.capacity = capacity
+        self.rng = rng or random
+        self.width = None
+        self.iterations = 0  # of the last choose_action
+
+    def reset(self, width):
+        capacity = self.capacity
+        self.width = width
+        self.size = 0
+        self.visits = [0] * capacity
+        self.rewards = [0.0] * capacity  # sum of rewards of the player who moved into the node
+        self.terminal = [NOT_TERMINAL] * capacity
+        self.children = [UNEXPANDED] * (capacity * width)
+        self.nodes = {}  # position key -> node
+
+    @staticmethod
+    def key(position, player):
+        # Unique per position and player to move: player 1's stones plus the mask, as in Position.key
+        return (position.boards[0] + (position.boards[0] | position.boards[1])) * 2 + (player == 1)
+
+    def node(self, position, player, mover):
+        # Node of position with player to move, created if it is new (None if the pool is full)
+        key = self.key(position, player)
+        node = self.nodes.get(key)
+        if node is None:
+            if self.size == self.capacity:
+                return None
+            node = self.size
+            self.size += 1
+            self.nodes[key] = node
+            if mover is not None and position.has_won(mover):
+                self.terminal[node] = WON
+            elif position.moves == position.width * position.height:
+                self.terminal[node] = DRAWN
+        return node
+
+    def select(self, node, legal):
+        # Child column by UCT, or an unexpanded legal column if there is one
+        children, visits, rewards = self.children, self.visits, self.rewards
+        base = node * self.width
+        untried = [col for col in legal if children[base + col] == UNEXPANDED]
+        if untried:
+            return self.rng.choice(untried)
+        log_visits = math.log(visits[node])
+        best_col, best_value = legal[0], -1.0
+        for col in legal:
+            child = children[base + col]
+            n = visits[child]
+            value = rewards[child] / n + EXPLORATION * math.sqrt(log_visits / n) if n else float('inf')
+            if value > best_value:
+                best_col, best_value = col, value
+        return best_col
+
+    def rollout(self, position, player):
+        # Winner of a random game from position with player to move (0 for a draw), undone afterwards
+        choice = self.rng.choice
+        cells = position.width * position.height
+        played = 0
+        winner = 0
+        while position.moves < cells:
+            position.add_stone(choice(position.actions()), player)
+            played += 1
+            if position.has_won(player):
+                winner = player
+                break
+            player = -player
+        for _ in range(played):
+            position.undo()
+        return winner
+
+    def iterate(self, position, root, player):
+        """One selection, expansion, rollout and backup from root; position is restored."""
+        terminal, children = self.terminal, self.children
+        path = [(root, -player)]  # (node, player who moved into it)
+        node, mover = root, -player
+        played = 0
+        while terminal[node] == NOT_TERMINAL:
+            col = self.select(node, position.actions())
+            slot = node * self.width + col
+            child = children[slot]
+            mover = -mover
+            position.add_stone(col, mover)
+            played += 1
+            if child == UNEXPANDED:
+                child = self.node(position, -mover, mover)
+                if child is None:  # pool full: score this leaf by a rollout without storing it
+                    winner = mover if position.has_won(mover) else self.rollout(position, -mover)
+                    break
+                children[slot] = child
+            path.append((child, mover))
+            node = child
+            if self.visits[child] == 0 and terminal[child] == NOT_TERMINAL:  # new leaf
+                winner = self.rollout(position, -mover)
+                break
+        else:
+            winner = mover if terminal[node] == WON else 0
+        for _ in range(played):
+            position.undo()
+        visits, rewards = self.visits, self.rewards
+        for node, node_mover in path:
+            visits[node] += 1
+            rewards[node] += 1.0 if winner == node_mover else 0.5 if winner == 0 else 0.0
+
+    def choose_action(self, board, player=1, control=None):
+        position = BitboardPosition.from_numpy(board)
+        if self.width != position.width or self.size > self.capacity // 2:
+            self.reset(position.width)
+        root = self.node(position, player, None)
+        legal = position.actions()
+        if control is None:
+            budget = self.num_simulations * len(legal) + 1  # check() aborts on reaching max_nodes
+            control = SearchControl(self.time_limit_ms, None if self.time_limit_ms else budget, check_interval=16)
+        self.iterations = 0
+        try:
+            while True:
+                control.check()
+                self.iterate(position, root, player)
+                self.iterations += 1
+        except SearchAborted:
+            pass
+        base = root * self.width
+        return max(legal, key=lambda col: self.visits[self.children[base + col]]
+                   if self.children[base + col] != UNEXPANDED else -1)
+
+
+def main():
+    # usage: python MonteCarloTreeSearch.py [rollouts per column] [max games]
+    from Arena import sequential_match
+    num_simulations = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    max_games = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    start_time = time.time()
+    match = sequential_match(f"mcts:{num_simulations}", f"montecarlo:{num_simulations}", max_games)
+    print(f"MCTS vs Monte Carlo, {num_simulations} rollouts per column: {match['games']} games in "
+          f"{time.time() - start_time:.1f} s, +{match['wins']} ={match['draws']} -{match['losses']}, "
+          f"Elo {match['elo']:+.0f} [{match['elo_interval'][0]:+.0f}, {match['elo_interval'][1]:+.0f}], "
+          f"SPRT decision {match['decision']}")
+
+
+if __name__ == "__main__":
+    main()
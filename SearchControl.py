@@ -0,0 +1,61 @@
+import time
+
+
+class SearchAborted(Exception):
+    """Raised from SearchControl.check() when the search has to stop."""
+
+
+class SearchControl:
+    """
+    Limits shared by a search: a time budget, a node budget and a cancel flag.
+
+    check() is called once per node. It only counts nodes; the clock and the cancel flag are
+    looked at every check_interval nodes, so the per-node cost stays a counter increment.
+    cancel() may be called from another thread.
+    """
+
+    def __init__(self, time_limit_ms=None, max_nodes=None, check_interval=1024):
+        self.deadline = None if time_limit_ms is None else time.perf_counter() + time_limit_ms / 1000
+        self.max_nodes = max_nodes
+        self.check_interval = check_interval
+        self.cancelled = False
+        self.aborted = False
+        self.nodes = 0
+        self.next_check = self.next_limit()
+
+    def next_limit(self):
+        limit = self.nodes + self.check_interval
+        return limit if self.max_nodes is None else min(limit, self.max_nodes)
+
+    def cancel(self):
+        self.cancelled = True
+
+    def check(self):
+        self.nodes += 1
+        if self.nodes >= self.next_check:
+            if (self.cancelled or (self.max_nodes is not None and self.nodes >= self.max_nodes)
+                    or (self.deadline is not None and time.perf_counter() > self.deadline)):
+                self.aborted = True
+                raise SearchAborted()
+            self.next_check = self.next_limit()
+
+
+class SearchResult:
+    """
+    Outcome of a search that may have been stopped early.
+
+    The true score lies in [lower, upper]; finished means the search completed and
+    lower == upper == score. score is the bound closest to a draw, so its sign is only
+    claimed when the bounds prove it.
+    """
+
+    def __init__(self, lower, upper, finished, nodes=0):
+        self.lower = lower
+        self.upper = upper
+        self.finished = finished
+        self.nodes = nodes
+        self.score = lower if lower > 0 else upper if upper < 0 else 0
+
+    def __repr__(self):
+        return (f"SearchResult(score={self.score}, lower={self.lower}, upper={self.upper}, "
+                f"finished={self.finished}, nodes={self.nodes})")
@@ -5,6 +5,7 @@ import time
 import math
 import sys
 
+from SearchControl import SearchAborted, SearchControl
 from TranspositionTable import TranspositionTable
 
 sys.setrecursionlimit(100000)
@@ -18,9 +19,12 @@ class Position:
     def __init__(self):
         self.current_position = 0
         self.mask = 0
+        self.mirror_position = 0  # current_position and mask of the left-right mirror image
+        self.mirror_mask = 0
         self.moves = 0
         self.column_order = self.initialize_column_order()
         self.move_sequence = []  # List to track the sequence of played columns
+        self.history = []  # Undo stack of the bitboards before each move
 
     def initialize_column_order(self):
         # Generate column order prioritizing center columns
@@ -46,11 +50,20 @@ class Position:
     def play(self, col):
         if not self.can_play(col):
             raise ValueError("Column is full or invalid move")
+        self.history.append((self.current_position, self.mask, self.mirror_position, self.mirror_mask))
         self.current_position ^= self.mask
         self.mask |= self.mask + self.bottom_mask(col)
+        self.mirror_position ^= self.mirror_mask
+        self.mirror_mask |= self.mirror_mask + self.bottom_mask(self.WIDTH - 1 - col)
         self.moves += 1
         self.move_sequence.append(col + 1)  # 1-based index
 
+    def undo(self):
+        """Take back the last move played."""
+        self.current_position, self.mask, self.mirror_position, self.mirror_mask = self.history.pop()
+        self.moves -= 1
+        self.move_sequence.pop()
+
     def is_winning_move(self, col):
         pos = self.current_position | ((self.mask + self.bottom_mask(col)) & self.column_mask(col))
         return self.alignment(pos)
@@ -106,19 +119,27 @@ class Position:
         return self.moves
 
     def clone(self):
-        """Create a deep copy of this Position object."""
+        """Create a copy of this Position object."""
+        # Without the undo history: the clone cannot undo past this position, but cloning stays O(1)
         new_position = Position()
         new_position.current_position = self.current_position
         new_position.mask = self.mask
+        new_position.mirror_position = self.mirror_position
+        new_position.mirror_mask = self.mirror_mask
         new_position.moves = self.moves
         new_position.column_order = self.column_order[:]  # Copy the list if it might change
         new_position.move_sequence = self.move_sequence[:]  # Ensure a deep copy of the move sequence
         return new_position
 
     def key(self):
-        # Generating a unique key for the current position
-        # Assuming `current_position` and `mask` can serve as a unique identifier
-        return self.current_position + (self.mask << 28)  # Simple unique key generation
+        # current_position + mask is unique: each column holds 2^k - 1 plus the current player's stones,
+        # which stays below the 7-bit stride. Taking the smaller of the key of the position and the key
+        # of its mirror image makes both share one transposition table entry (they have the same score).
+        return min(self.current_position + self.mask, self.mirror_position + self.mirror_mask)
+
+    def is_mirrored(self):
+        """True if key() was taken from the mirror image, so moves stored under it are mirrored."""
+        return self.mirror_position + self.mirror_mask < self.current_position + self.mask
 
     def board_state(self):
         board = [[0] * self.WIDTH for _ in range(self.HEIGHT)]
@@ -178,49 +199,150 @@ def create_random_position(position, move_count):
             break
 
 
-def negamax(position, alpha, beta, trans_table):
-    # Check transposition table first
-    tt_entry = trans_table.get(position.key())
-    if tt_entry:
-        # Assuming tt_entry is a score already adjusted for minimax value
-        return tt_entry
-
-    # Terminal node check (draw or win)
-    if position.is_terminal():
-        return position.evaluate()
-
-    max_value = -float('inf')
-    for col in range(position.WIDTH):
-        if position.can_play(col):
-            # Create new position by playing the move
-            new_position = position.clone()
-            new_position.play(col)
-
-            # Immediate win check
-            if new_position.is_winning_move(col):
-                score = (Position.WIDTH * Position.HEIGHT + 1 - new_position.nb_moves()) // 2
-                trans_table.put(new_position.key(), score)
+EXACT, LOWER_BOUND, UPPER_BOUND = 0, 1, 2
+
+
+def center_evaluator(position):
+    """Default leaf evaluation in (-1, 1) for the player to move: stones in the center column."""
+    center = Position.column_mask(Position.WIDTH // 2)
+    own = bin(position.current_position & center).count('1')
+    opponent = bin((position.current_position ^ position.mask) & center).count('1')
+    return (own - opponent) / (Position.HEIGHT + 1)
+
+
+def ordered_moves(position, first_move=None):
+    # Best move from the previous iteration first, then center-first column order
+    moves = [col for col in position.column_order if position.can_play(col) and col != first_move]
+    if first_move is not None and position.can_play(first_move):
+        moves.insert(0, first_move)
+    return moves
+
+
+def negamax(position, alpha, beta, trans_table, depth=None, evaluator=center_evaluator, control=None):
+    """
+    Depth-limited negamax with alpha-beta pruning, returns the score for the player to move.
+
+    Exact scores use the solver convention ((WIDTH * HEIGHT + 1 - moves) // 2 for a win);
+    positions at depth 0 are scored by evaluator, which must stay in (-1, 1) so that heuristic
+    values never look like proven results. depth=None searches to the end of the game.
+    The table keeps (depth, bound, score, best move) entries shared by all iterations.
+    """
+    if control is not None:
+        control.check()  # raises SearchAborted once the time or node budget is spent
+
+    if position.nb_moves() == Position.WIDTH * Position.HEIGHT:
+        return 0  # Draw
+    for col in range(Position.WIDTH):
+        if position.can_play(col) and position.is_winning_move(col):
+            return (Position.WIDTH * Position.HEIGHT + 1 - position.nb_moves()) // 2
+    if depth == 0:
+        return evaluator(position)
+
+    remaining = Position.WIDTH * Position.HEIGHT - position.nb_moves() if depth is None else depth
+    alpha_orig = alpha
+    key = position.key()
+    mirrored = position.is_mirrored()
+    best_move = None
+    entry = trans_table.get(key)
+    if entry is not None:
+        entry_depth, bound, score, best_move = entry
+        if best_move is not None and mirrored:
+            best_move = Position.WIDTH - 1 - best_move
+        if entry_depth >= remaining:
+            if bound == EXACT:
                 return score
-
-            # Recursive negamax call
-            value = -negamax(new_position, -beta, -alpha, trans_table)
-            max_value = max(max_value, value)
-            alpha = max(alpha, value)
+            if bound == LOWER_BOUND:
+                alpha = max(alpha, score)
+            else:
+                beta = min(beta, score)
             if alpha >= beta:
-                break
+                return score
+
+    max_value = -float('inf')
+    for col in ordered_moves(position, best_move):
+        position.play(col)
+        try:
+            value = -negamax(position, -beta, -alpha, trans_table, None if depth is None else depth - 1,
+                             evaluator, control)
+        finally:
+            position.undo()
+        if value > max_value:
+            max_value = value
+            best_move = col
+        alpha = max(alpha, value)
+        if alpha >= beta:
+            break
 
-    # Store the computed value in the transposition table before returning
-    trans_table.put(position.key(), max_value)
+    if max_value <= alpha_orig:
+        bound = UPPER_BOUND
+    elif max_value >= beta:
+        bound = LOWER_BOUND
+    else:
+        bound = EXACT
+    stored_move = Position.WIDTH - 1 - best_move if mirrored else best_move
+    trans_table.put(key, (remaining, bound, max_value, stored_move))
     return max_value
 
 
-def iterative_deepening(position, max_depth):
-    trans_table = TranspositionTable()
-    best_score = None
-    for depth in range(1, max_depth + 1):
-        best_score = negamax(position, -float('inf'), float('inf'), trans_table)
-        print(f"Depth {depth}: Best score {best_score}")
-    return best_score
+def search_root(position, depth, trans_table, evaluator=center_evaluator, control=None):
+    """One depth-limited search of every move at the root, returns (score, best move)."""
+    entry = trans_table.get(position.key())
+    first_move = None
+    if entry is not None and entry[3] is not None:
+        first_move = Position.WIDTH - 1 - entry[3] if position.is_mirrored() else entry[3]
+
+    alpha, beta = -float('inf'), float('inf')
+    best_score, best_move = -float('inf'), None
+    for col in ordered_moves(position, first_move):
+        if position.is_winning_move(col):
+            return (Position.WIDTH * Position.HEIGHT + 1 - position.nb_moves()) // 2, col
+        position.play(col)
+        try:
+            score = -negamax(position, -beta, -alpha, trans_table, depth - 1, evaluator, control)
+        finally:
+            position.undo()
+        if score > best_score:
+            best_score, best_move = score, col
+        alpha = max(alpha, score)
+
+    stored_move = Position.WIDTH - 1 - best_move if position.is_mirrored() else best_move
+    trans_table.put(position.key(), (depth, EXACT, best_score, stored_move))
+    return best_score, best_move
+
+
+def iterative_deepening(position, max_depth, trans_table=None, evaluator=center_evaluator, control=None):
+    """
+    Search depth 1, 2, ... max_depth sharing one table, each iteration trying the previous best
+    move first. Returns (score, best move, depth) of the deepest completed iteration; with a
+    SearchControl the search stops when it runs out and the last completed iteration is returned.
+    """
+    if trans_table is None:
+        trans_table = TranspositionTable(size=1000003)
+    remaining = Position.WIDTH * Position.HEIGHT - position.nb_moves()
+    best_score, best_move, completed = None, None, 0
+    for depth in range(1, min(max_depth, remaining) + 1):
+        try:
+            best_score, best_move = search_root(position, depth, trans_table, evaluator, control)
+        except SearchAborted:
+            break
+        completed = depth
+        print(f"Depth {depth}: Best score {best_score}, best move {best_move + 1}")
+        if abs(best_score) >= 1:
+            break  # proven win or loss, deeper iterations cannot change it
+    return best_score, best_move, completed
+
+
+def best_move_within(position, time_limit_ms, trans_table=None, evaluator=center_evaluator):
+    """
+    Anytime play: the best move found by iterative deepening within time_limit_ms milliseconds.
+    Returns (score, move, depth) like iterative_deepening, the score is None if no depth finished.
+    """
+    control = SearchControl(time_limit_ms, check_interval=64)  # nodes are slow here, look at the clock often
+    score, move, depth = iterative_deepening(position, Position.WIDTH * Position.HEIGHT, trans_table,
+                                             evaluator, control)
+    if move is None:  # not even depth 1 finished, fall back to the first legal center-first move
+        move = ordered_moves(position)[0]
+    return score, move, depth
 
 
 if __name__ == "__main__":